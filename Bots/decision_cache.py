@@ -0,0 +1,88 @@
+from collections import OrderedDict
+from Helper.cardset import NO_CARD, NUM_RANKS
+from Helper.card import SUITS
+
+SUIT_MASK = (1 << NUM_RANKS) - 1
+
+
+def canonical_position(hand, middle, unseen, lead, last):
+    """Relabels the suits of a position so that positions that differ only by suit names match.
+
+    Suits play no part in the rules, only ranks do. Suits are sorted by what
+    each one holds in the hand, the pile and the unseen cards. Returns the
+    relabelled (hand, middle, unseen, lead, last) and suit_map, the new index
+    of every old suit.
+    """
+    def signature(suit):
+        shift = suit * NUM_RANKS
+        return (hand >> shift & SUIT_MASK, middle >> shift & SUIT_MASK, unseen >> shift & SUIT_MASK,
+                lead != NO_CARD and lead // NUM_RANKS == suit, last != NO_CARD and last // NUM_RANKS == suit)
+
+    order = sorted(range(len(SUITS)), key=signature, reverse=True)
+    suit_map = [0] * len(SUITS)
+    for new, old in enumerate(order):
+        suit_map[old] = new
+
+    def relabel(mask):
+        result = 0
+        for old, new in enumerate(suit_map):
+            result |= (mask >> old * NUM_RANKS & SUIT_MASK) << new * NUM_RANKS
+        return result
+
+    position = (relabel(hand), relabel(middle), relabel(unseen), canonical_card(lead, suit_map),
+                canonical_card(last, suit_map))
+    return position, suit_map
+
+
+def canonical_card(card, suit_map):
+    if card == NO_CARD:
+        return NO_CARD
+    return suit_map[card // NUM_RANKS] * NUM_RANKS + card % NUM_RANKS
+
+
+class DecisionCache:
+    """Bounded LRU map from a canonical position to the simulation results found for it.
+
+    Entries are (simulations, {card: score sum}, {card: sum of squared scores})
+    with cards in the canonical labelling. hits, misses and evictions count
+    lookups and entries dropped to stay within max_size; warm_starts counts
+    hits that still needed more simulations.
+    """
+
+    def __init__(self, max_size=10_000):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.warm_starts = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __repr__(self):
+        return (f"DecisionCache(size={len(self)}/{self.max_size}, hits={self.hits}, misses={self.misses}, "
+                f"evictions={self.evictions}, warm_starts={self.warm_starts})")
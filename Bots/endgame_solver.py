@@ -0,0 +1,92 @@
+from Helper.cardset import NO_CARD, KILL_MASKS, PASS, legal_action_mask, card_ids, pile_score
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class EndgameSolver:
+    """Exact alpha-beta search of the rest of a deck once nothing is left to draw.
+
+    With an empty deck both hands are known, so the remaining hands can be
+    played out with the rules of GameState. Values are the points the player
+    to move takes from here on minus the points of the other player.
+    Positions are cached in a transposition table keyed on both hands, the
+    pile, the lead card and who has the initiative; it is kept between calls
+    and cleared when it grows past max_table_size.
+    """
+
+    def __init__(self, max_table_size=1_000_000):
+        self.max_table_size = max_table_size
+        self.table = {}
+        self.nodes = 0  # Positions searched by the last solve call
+
+    def solve(self, my_hand, their_hand, middle, lead, has_initiative):
+        """Solves the position for the player to move.
+
+        Returns (value, action), action is a card id or PASS.
+        """
+        if len(self.table) > self.max_table_size:
+            self.table.clear()
+        self.nodes = 0
+        value = self._search(my_hand, their_hand, middle, lead, has_initiative, -1_000, 1_000)
+        return value, self.table[my_hand, their_hand, middle, lead, has_initiative][2]
+
+    def _moves(self, my_hand, lead, has_initiative):
+        return card_ids(legal_action_mask(my_hand, lead, has_initiative))
+
+    def _search(self, my_hand, their_hand, middle, lead, has_initiative, alpha, beta):
+        if not middle and not my_hand and not their_hand:
+            return 0
+        key = (my_hand, their_hand, middle, lead, has_initiative)
+        entry = self.table.get(key)
+        best_first = None
+        if entry is not None:
+            value, flag, best_first = entry
+            if flag == EXACT:
+                return value
+            if flag == LOWER and value >= beta:
+                return value
+            if flag == UPPER and value <= alpha:
+                return value
+        self.nodes += 1
+        original_alpha = alpha
+
+        moves = self._moves(my_hand, lead, has_initiative)
+        if best_first is not None:
+            moves.remove(best_first)
+            moves.insert(0, best_first)
+        best_value, best_move = -1_000, None
+        for move in moves:
+            value = self._value_after(move, my_hand, their_hand, middle, lead, has_initiative, alpha, beta)
+            if value > best_value:
+                best_value, best_move = value, move
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                break
+
+        if best_value <= original_alpha:
+            flag = UPPER
+        elif best_value >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table[key] = (best_value, flag, best_move)
+        return best_value
+
+    def _value_after(self, move, my_hand, their_hand, middle, lead, has_initiative, alpha, beta):
+        """Value of a move for the player making it."""
+        if move == PASS:
+            # The pile goes to the other player, who leads the next hand
+            score = pile_score(middle)
+            return -score - self._search(their_hand, my_hand, 0, NO_CARD, True, -beta - score, -alpha - score)
+        bit = 1 << move
+        my_hand ^= bit
+        middle |= bit
+        if lead == NO_CARD:
+            lead = move
+        if has_initiative or KILL_MASKS[lead] & bit:
+            # The other player answers on the same pile
+            return -self._search(their_hand, my_hand, middle, lead, not has_initiative, -beta, -alpha)
+        # No kill: the initiative takes the pile and leads the next hand
+        score = pile_score(middle)
+        return -score - self._search(their_hand, my_hand, 0, NO_CARD, True, -beta - score, -alpha - score)
@@ -0,0 +1,201 @@
+import logging
+import math
+import random
+import time
+from Helper.cardset import NO_CARD, card_id, card_ids, to_mask, playable_mask, pile_score
+from Helper.engine import PASS
+from Bots.monte_carlo_bot import PENALTIES, deal_opponent
+from Bots.search_state import SearchState, BOT
+from Bots.rollout import rollout, random_policy, RolloutStats
+
+logger = logging.getLogger(__name__)
+
+
+class Node:
+    """Information set node: statistics of one action sequence, shared by all determinizations."""
+    __slots__ = ('children', 'visits', 'total', 'avail')
+
+    def __init__(self):
+        self.children = {}  # action -> Node
+        self.visits = 0
+        self.total = 0  # Sum of rewards for the bot
+        self.avail = 0  # How often the action leading here was legal when its parent was selected from
+
+
+class ISMCTSBot:
+    """Information-Set MCTS over the current hand.
+
+    Every iteration deals the opponent a random hand from the unseen cards,
+    walks the shared tree with UCT (restricted to the actions legal in that
+    deal), expands one action and finishes with a rollout. The subtree under
+    the bot's move and the opponent's reply is kept for the next decision of
+    the same hand.
+    """
+
+    def __init__(self, num_iterations=200, exploration=20.0, rollout_policy=random_policy, seed=None):
+        self.num_iterations = num_iterations
+        self.exploration = exploration
+        self.rollout_policy = rollout_policy
+        self.rollout_stats = RolloutStats()  # Rollouts of the last choose_move call
+        self.tree_reused = False  # Whether the last decision started from a kept subtree
+        self._root = None
+        self._root_key = None  # (middle, middle_len, lead) the root was searched for
+        self._played = None
+        self.reseed(seed)
+
+    def reseed(self, seed):
+        """Restarts the random stream and drops the kept tree.
+
+        Deals, expansions and random rollout moves all draw from this stream,
+        so a seeded bot plays the same whatever else runs alongside it.
+        """
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self._root = None
+
+    def choose_move(self, player_hand, card_in_middle, cards_in_the_deck, opponent_hand_size, is_initiative,
+                    time_budget_ms=None):
+        """Same arguments and return value as MonteCarloBot.choose_move.
+
+        With time_budget_ms the search iterates until the budget is spent instead of num_iterations times.
+        """
+        if not player_hand:
+            return None, True
+
+        # If we're not initiative and there's no card in middle, play anything
+        if not is_initiative and not card_in_middle:
+            return 0, False
+
+        hand = to_mask(player_hand)
+        middle = to_mask(card_in_middle) if card_in_middle else 0
+        middle_len = len(card_in_middle) if card_in_middle else 0
+        lead = card_id(card_in_middle[0]) if card_in_middle else NO_CARD
+        hand_ids = [card_id(card) for card in player_hand]
+        if not playable_mask(hand, lead, is_initiative):
+            # Nothing answers the lead card, the pile has to be given away
+            self._root = None
+            return None, True
+
+        root = self._reuse_root(middle, middle_len, lead)
+        state = SearchState(hand, 0, middle, lead, NO_CARD, middle_len, is_initiative, self._rng)
+        unseen_ids = card_ids(to_mask(cards_in_the_deck))
+        opponent_hand_size = min(opponent_hand_size, len(unseen_ids))
+        self.rollout_stats = RolloutStats()
+        if time_budget_ms is None:
+            for _ in range(self.num_iterations):
+                self._iterate(root, state, unseen_ids, opponent_hand_size)
+        else:
+            deadline = time.monotonic() + time_budget_ms / 1000
+            self._iterate(root, state, unseen_ids, opponent_hand_size)
+            while time.monotonic() < deadline:
+                self._iterate(root, state, unseen_ids, opponent_hand_size)
+
+        action = self._best_action(root)
+        logger.debug("ismcts root %s, chose %s, reused %s, %s",
+                     {a: (c.visits, c.total / c.visits if c.visits else 0) for a, c in root.children.items()},
+                     action, self.tree_reused, self.rollout_stats)
+        self._root = root
+        self._root_key = (middle, middle_len, lead)
+        self._played = action
+        if action == PASS:
+            return None, True
+        return hand_ids.index(action), False
+
+    def _reuse_root(self, middle, middle_len, lead):
+        """Returns the kept subtree if the pile grew by exactly our last move and one reply."""
+        self.tree_reused = False
+        if self._root is None or self._played in (None, PASS):
+            return Node()
+        old_middle, old_len, old_lead = self._root_key
+        added = middle & ~old_middle
+        if (middle_len != old_len + 2 or old_middle & ~middle or old_lead not in (NO_CARD, lead)
+                or not added >> self._played & 1):
+            return Node()
+        reply = added ^ (1 << self._played)
+        child = self._root.children.get(self._played)
+        node = child.children.get(reply.bit_length() - 1) if child is not None and reply else None
+        if node is None:
+            return Node()
+        self.tree_reused = True
+        return node
+
+    def _actions(self, state, depth):
+        """Legal actions of the player to move, empty if the hand is over."""
+        if depth and state.hand_over():
+            return []
+        legal = state.legal_mask()
+        if not legal:
+            return []
+        actions = card_ids(legal)
+        if state.middle_len and state.has_initiative():
+            actions.append(PASS)
+        return actions
+
+    def _iterate(self, root, state, unseen_ids, opponent_hand_size):
+        """One determinize, select, expand, simulate and backpropagate pass."""
+        # Determinize: deal the opponent a hand from the unseen cards
+        deal_opponent(state, unseen_ids, opponent_hand_size, self._rng)
+
+        node = root
+        path = [root]
+        depth = 0
+        reward = None
+        while True:
+            actions = self._actions(state, depth)
+            if not actions:
+                break
+            untried = [a for a in actions if a not in node.children]
+            if untried:
+                for a in actions:
+                    if a in node.children:
+                        node.children[a].avail += 1
+                action = self._rng.choice(untried)
+                child = node.children[action] = Node()
+                child.avail = 1
+                expand = True
+            else:
+                action, child = self._select(node, actions, state.turn == BOT)
+                expand = False
+            path.append(child)
+            node = child
+            if action == PASS:
+                # The initiative gives the pile to the other player
+                score = pile_score(state.middle)
+                reward = -score if state.turn == BOT else score
+                break
+            state.apply(action)
+            depth += 1
+            if expand:
+                break
+
+        if reward is None:
+            reward = rollout(state, self.rollout_policy, self.rollout_stats)
+        for n in path:
+            n.visits += 1
+            n.total += reward
+        for _ in range(depth):
+            state.undo(state.last)
+
+    def _select(self, node, actions, bot_to_move):
+        """UCT over the children that are legal in this determinization."""
+        sign = 1 if bot_to_move else -1
+        c = self.exploration
+        best_action, best_child, best_value = None, None, -math.inf
+        for a in actions:
+            child = node.children[a]
+            child.avail += 1
+            value = sign * child.total / child.visits + c * math.sqrt(math.log(child.avail) / child.visits)
+            if value > best_value:
+                best_action, best_child, best_value = a, child, value
+        return best_action, best_child
+
+    def _best_action(self, root):
+        """Best mean reward at the root after the strategic penalty of MonteCarloBot."""
+        best_action, best_value = None, -math.inf
+        for action, child in root.children.items():
+            if not child.visits:
+                continue
+            value = child.total / child.visits - (0 if action == PASS else PENALTIES[action])
+            if value > best_value:
+                best_action, best_value = action, value
+        return best_action
@@ -1,24 +1,187 @@
+import logging
+import math
 import random
-from copy import deepcopy
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from Helper.cardset import NO_CARD, card_id, card_ids, to_mask, playable_mask, pile_score
+from Helper.card import CARDS
+from Bots.search_state import SearchState, OPPONENT
+from Bots.rollout import rollout, random_policy, RolloutStats
+from Bots.endgame_solver import EndgameSolver
+from Bots.search_stats import SearchStats, MatchStats, SIMULATION, ENDGAME, FORCED, CACHED
+from Bots.decision_cache import DecisionCache, canonical_position, canonical_card
+from Helper.engine import PASS
+
+logger = logging.getLogger(__name__)
+
+# Strategic penalty for giving up a seven, a 10 or an Ace, indexed by card id
+PENALTIES = tuple(10 if card.rank in ("7", "10", "Ace") else 0 for card in CARDS)
+
+
+def deal_opponent(state, unseen_ids, opponent_hand_size, rng=random):
+    """Gives the opponent a random hand from unseen_ids, shuffling just its part of unseen_ids in place."""
+    opp_hand = 0
+    randrange = rng.randrange
+    for j in range(opponent_hand_size):
+        k = randrange(j, len(unseen_ids))
+        unseen_ids[j], unseen_ids[k] = unseen_ids[k], unseen_ids[j]
+        opp_hand |= 1 << unseen_ids[j]
+    state.hands[OPPONENT] = opp_hand
+
+
+def simulate_game(state, unseen_ids, opponent_hand_size, rollout_policy, stats, timed=False):
+    """Deals the opponent a random hand from unseen_ids and plays the hand out, drawing from state.rng.
+
+    With timed the time spent dealing and in the rollout is added to stats.
+    """
+    if timed:
+        start = time.perf_counter()
+    deal_opponent(state, unseen_ids, opponent_hand_size, state.rng)
+    if not timed:
+        return rollout(state, rollout_policy, stats)
+    dealt = time.perf_counter()
+    score = rollout(state, rollout_policy, stats)
+    stats.determinize_seconds += dealt - start
+    stats.rollout_seconds += time.perf_counter() - dealt
+    return score
+
+
+def run_simulations(state, unseen_ids, opponent_hand_size, moves, num_simulations, rollout_policy, rng=random,
+                    deadline=None, timed=False):
+    """Runs rounds of one rollout after each of the moves (card ids).
+
+    Stops after num_simulations rounds, or once time.monotonic() passes the
+    deadline if one is given (num_simulations may then be None). Returns the
+    score sums and sums of squares per move, the number of rounds and the
+    RolloutStats. The deals and random rollout moves come from rng
+    (random.Random or the random module), so the same rng state gives the
+    same sums in any process or thread. timed fills in the phase times of the
+    RolloutStats.
+    """
+    state.rng = rng
+    stats = RolloutStats()
+    sums = [0] * len(moves)
+    squares = [0] * len(moves)
+    rounds = 0
+    while moves and (num_simulations is None or rounds < num_simulations):
+        for i, cid in enumerate(moves):
+            state.apply(cid)
+            score = simulate_game(state, unseen_ids, opponent_hand_size, rollout_policy, stats, timed)
+            state.undo(cid)
+            sums[i] += score
+            squares[i] += score * score
+        rounds += 1
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+    return sums, squares, rounds, stats
+
+
+def score_margin(values, variances, n):
+    """Gap between the two best values and that gap in standard errors (inf if certain)."""
+    if len(values) < 2:
+        return math.inf, math.inf
+    order = sorted(range(len(values)), key=values.__getitem__, reverse=True)
+    best, second = order[0], order[1]
+    margin = values[best] - values[second]
+    error = math.sqrt((variances[best] + variances[second]) / n) if n else 0.0
+    return margin, (margin / error if error else math.inf)
+
 
 class MonteCarloBot:
-    def __init__(self, num_simulations=100):
+    def __init__(self, num_simulations=100, rollout_policy=random_policy, workers=1, seed=None,
+                 use_endgame_solver=True, collect_stats=False, cache_size=0, network=None, leaf_depth=None,
+                 network_batch=256):
+        """
+        Args:
+            num_simulations: Rollouts per playable card and decision
+            rollout_policy: policy(state, legal_mask) -> card id used inside rollouts
+            workers: Processes the simulations are spread over, 1 runs them in this process
+            seed: Makes decisions reproducible for a given number of workers
+            use_endgame_solver: Solve the position exactly once the deck is empty
+            collect_stats: Record a SearchStats for every decision in last_stats and add it to match_stats
+            cache_size: Positions whose simulation results are kept for reuse, 0 disables the cache.
+                A position seen again (up to a relabelling of suits) only runs the simulations it
+                is missing, so decisions then depend on the games played before
+            network: RL.policy_net.PolicyValueNet (or the path of its weights) that replaces
+                rollout_policy, playing the rollouts of network_batch simulations at a time
+            leaf_depth: With a network, cut rollouts short after this many plies and score
+                them with its value head
+        """
         self.num_simulations = num_simulations
+        self.endgame_solver = EndgameSolver() if use_endgame_solver else None
+        self.rollout_policy = rollout_policy
+        self.workers = workers
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self._pool = None
+        self.rollout_stats = RolloutStats()  # Rollouts of the last choose_move call
+        self.simulations_done = 0  # Simulations per move of the last choose_move call
+        self.score_margin = math.inf  # Gap between the two best options of the last call
+        self.margin_z = math.inf  # That gap in standard errors
+        self.collect_stats = collect_stats
+        self.last_stats = None  # SearchStats of the last choose_move call when collecting
+        self.match_stats = MatchStats()  # Totals since the last reset_match_stats()
+        self.cache = DecisionCache(cache_size) if cache_size > 0 else None
+        self.network = network
+        self._simulate, self._policy = run_simulations, rollout_policy
+        if network is not None:
+            # NumPy is only needed for network rollouts
+            from RL.policy_net import PolicyValueNet, run_network_simulations
+            if isinstance(network, str):
+                self.network = PolicyValueNet.load(network)
+            self._simulate = partial(run_network_simulations, leaf_depth=leaf_depth, batch_size=network_batch)
+            self._policy = self.network
 
-    def choose_move(self, player_hand, card_in_middle, cards_in_the_deck, opponent_hand_size, is_initiative):
+    def choose_move(self, player_hand, card_in_middle, cards_in_the_deck, opponent_hand_size, is_initiative,
+                    time_budget_ms=None):
         """
         Choose the best move based on Monte Carlo simulation results.
-        
+
         Args:
             player_hand: List of cards in bot's hand
             card_in_middle: Current card in the middle (or None if no card)
             cards_in_the_deck: List of remaining cards in deck
             opponent_hand_size: Number of cards in opponent's hand
             is_initiative: Boolean indicating if bot has initiative
-        
+            time_budget_ms: If given, simulate until this many milliseconds have passed
+                instead of running num_simulations, and play the best move found so far
+
         Returns:
             (card_index, should_pass): Tuple of chosen card index and whether to pass
         """
+        if not self.collect_stats:
+            return self._choose_move(player_hand, card_in_middle, cards_in_the_deck, opponent_hand_size,
+                                     is_initiative, time_budget_ms, None)
+        stats = SearchStats(FORCED)
+        start = time.perf_counter()
+        result = self._choose_move(player_hand, card_in_middle, cards_in_the_deck, opponent_hand_size,
+                                   is_initiative, time_budget_ms, stats)
+        stats.seconds = time.perf_counter() - start
+        self.last_stats = stats
+        self.match_stats.add(stats)
+        return result
+
+    def reseed(self, seed):
+        """Restarts the bot's random stream, e.g. for every game of a reproducible batch.
+
+        The endgame table is cleared too, since among equally good moves the one
+        it returns depends on what was searched before. The decision cache is
+        kept so it can serve the next games; call cache.clear() for games that
+        must not depend on earlier ones, as tournament.play_match does.
+        """
+        self.seed = seed
+        self._rng = random.Random(seed)
+        if self.endgame_solver is not None:
+            self.endgame_solver.table.clear()
+
+    def reset_match_stats(self):
+        """Starts a new MatchStats, e.g. at the start of a match."""
+        self.match_stats = MatchStats()
+
+    def _choose_move(self, player_hand, card_in_middle, cards_in_the_deck, opponent_hand_size, is_initiative,
+                     time_budget_ms, stats):
+        """choose_move, filling in stats if it is not None."""
         if not player_hand:
             return None, True
 
@@ -26,150 +189,159 @@ class MonteCarloBot:
         if not is_initiative and not card_in_middle:
             return 0, False
 
-        # Initialize scores for each possible move
-        move_scores = {i: 0 for i in range(len(player_hand))}
-        pass_score = 0
-
-        # Run simulations for each possible move
-        for _ in range(self.num_simulations):
-            # Create deep copies for simulation
-            deck_copy = deepcopy(cards_in_the_deck)
-            
-            # Try each possible move
-            for i, card in enumerate(player_hand):
-                if self._is_playable(card, card_in_middle, is_initiative):
-                    # Simulate game after playing this card
-                    strategic_penalty = self._calculate_penalty(card)
-                    
-                    # Create new simulation state
-                    new_player_hand = player_hand[:i] + player_hand[i+1:]
-                    new_middle = [card] if not card_in_middle else card_in_middle + [card]
-                    
-                    score = self._simulate_game(
-                        deepcopy(new_player_hand),
-                        deepcopy(new_middle),
-                        deepcopy(deck_copy),
-                        opponent_hand_size,
-                        is_initiative
-                    )
-                    move_scores[i] += (score - strategic_penalty)
-
-            # Simulate passing if we have initiative and there's a card in middle
-            if is_initiative and card_in_middle:
-                pass_score += -sum(card.get_score() for card in card_in_middle)
+        # Work on card sets instead of lists of cards
+        hand = to_mask(player_hand)
+        middle = to_mask(card_in_middle) if card_in_middle else 0
+        lead = card_id(card_in_middle[0]) if card_in_middle else NO_CARD
+        unseen = to_mask(cards_in_the_deck)
+        playable = playable_mask(hand, lead, is_initiative)
+        hand_ids = [card_id(card) for card in player_hand]
+        moves = [i for i, cid in enumerate(hand_ids) if playable >> cid & 1]
+
+        # With an empty deck the opponent holds exactly the unseen cards, so the rest is solved exactly
+        if self.endgame_solver is not None and len(cards_in_the_deck) == opponent_hand_size:
+            value, action = self.endgame_solver.solve(hand, unseen, middle, lead, is_initiative)
+            logger.debug("endgame solved: value %d, action %s, %d nodes", value, action, self.endgame_solver.nodes)
+            self.simulations_done = 0
+            self.score_margin = self.margin_z = math.inf
+            if stats is not None:
+                stats.method = ENDGAME
+            if action == PASS:
+                return None, True
+            return hand_ids.index(action), False
+
+        # One search state and one unseen list serve every simulation
+        last = card_id(card_in_middle[-1]) if card_in_middle else NO_CARD
+        state = SearchState(hand, 0, middle, lead, last, len(card_in_middle) if card_in_middle else 0, is_initiative,
+                            self._rng)
+        unseen_ids = card_ids(unseen)
+        opponent_hand_size = min(opponent_hand_size, len(unseen_ids))
+
+        deadline = None if time_budget_ms is None else time.monotonic() + time_budget_ms / 1000
+        needed = self.num_simulations
+        entry = None
+        if self.cache is not None:
+            position, suit_map = canonical_position(hand, middle, unseen, lead, last)
+            cache_key = position + (opponent_hand_size, is_initiative)
+            cache_moves = [canonical_card(hand_ids[i], suit_map) for i in moves]
+            entry = self.cache.get(cache_key)
+            if entry is not None and deadline is None:
+                needed = max(0, needed - entry[0])
+
+        if deadline is not None or needed:
+            sums, squares, n, self.rollout_stats = self._run(
+                state, unseen_ids, opponent_hand_size, [hand_ids[i] for i in moves], deadline, stats is not None,
+                needed)
+            if entry is not None:
+                self.cache.warm_starts += 1
+        else:
+            sums, squares, n, self.rollout_stats = [0] * len(moves), [0] * len(moves), 0, RolloutStats()
+        if self.cache is not None:
+            if entry is not None:
+                # Continue from the simulations stored for the position
+                cached_n, cached_sums, cached_squares = entry
+                sums = [total + cached_sums[cid] for total, cid in zip(sums, cache_moves)]
+                squares = [square + cached_squares[cid] for square, cid in zip(squares, cache_moves)]
+                n += cached_n
+            self.cache.put(cache_key, (n, dict(zip(cache_moves, sums)), dict(zip(cache_moves, squares))))
+        self.simulations_done = n
+        if stats is not None:
+            scoring_start = time.perf_counter()
 
         # Average the scores
-        for move in move_scores:
-            move_scores[move] /= self.num_simulations
+        move_scores = {i: total / n - self._calculate_penalty(player_hand[i])
+                       for i, total in zip(moves, sums)}
+        variances = [square / n - (total / n) ** 2 for total, square in zip(sums, squares)]
+        # Passing gives the middle pile away
+        pass_score = -pile_score(middle) if is_initiative and card_in_middle else 0
+        values = list(move_scores.values())
         if is_initiative and card_in_middle:
-            pass_score /= self.num_simulations
-        print(move_scores)
+            values.append(pass_score)
+            variances.append(0.0)
+        self.score_margin, self.margin_z = score_margin(values, variances, n)
+        if stats is not None:
+            if not moves:
+                stats.method = FORCED
+            elif entry is not None and deadline is None and not needed:
+                stats.method = CACHED
+            else:
+                stats.method = SIMULATION
+            stats.simulations = n
+            stats.rollouts = self.rollout_stats
+            stats.moves = {hand_ids[i]: (n, total / n, var) for i, total, var in zip(moves, sums, variances)}
+            if is_initiative and card_in_middle:
+                stats.moves[PASS] = (0, pass_score, 0.0)
+            stats.score_margin, stats.margin_z = self.score_margin, self.margin_z
+            stats.scoring_seconds = time.perf_counter() - scoring_start
+        logger.debug("move scores %s, pass score %s, %d simulations, margin %.2f (z %.2f), %s", move_scores,
+                     pass_score, n, self.score_margin, self.margin_z, self.rollout_stats)
         # Find best move
         best_move_score = max(move_scores.values(), default=-float('inf'))
-        
+
         # If passing is better than playing any card
         if pass_score > best_move_score and is_initiative and card_in_middle:
             return None, True
 
         # Find the best card to play
-        best_moves = [i for i, score in move_scores.items() 
-                     if score == best_move_score and 
-                     self._is_playable(player_hand[i], card_in_middle, is_initiative)]
+        best_moves = [i for i, score in move_scores.items() if score == best_move_score]
 
         if best_moves:
-            return random.choice(best_moves), False
+            return self._rng.choice(best_moves), False
         return None, True
-    
+
+    def _run(self, state, unseen_ids, opponent_hand_size, moves, deadline=None, timed=False, num_simulations=None):
+        """Runs the simulations here or root-parallel on the worker pool and merges the sums.
+
+        num_simulations defaults to self.num_simulations.
+        """
+        if num_simulations is None:
+            num_simulations = self.num_simulations
+        if self.workers <= 1:
+            return self._simulate(state, unseen_ids, opponent_hand_size, moves,
+                                  None if deadline else num_simulations, self._policy, self._rng, deadline, timed)
+        # Every worker gets its share of the simulations (or the whole time budget) and its own stream
+        share, extra = divmod(num_simulations, self.workers)
+        pool = self._get_pool()
+        futures = [
+            pool.submit(self._simulate, state, list(unseen_ids), opponent_hand_size, moves,
+                        None if deadline else share + (w < extra), self._policy,
+                        random.Random(self._rng.getrandbits(64)), deadline, timed)
+            for w in range(self.workers) if deadline or share + (w < extra)
+        ]
+        sums = [0] * len(moves)
+        squares = [0] * len(moves)
+        rounds = 0
+        stats = RolloutStats()
+        for future in futures:
+            worker_sums, worker_squares, worker_rounds, worker_stats = future.result()
+            sums = [a + b for a, b in zip(sums, worker_sums)]
+            squares = [a + b for a, b in zip(squares, worker_squares)]
+            rounds += worker_rounds
+            stats.merge(worker_stats)
+        return sums, squares, rounds, stats
+
+    def _get_pool(self):
+        """Creates the process pool on first use, it is kept for the following moves."""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def close(self):
+        """Shuts the worker pool down."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
     def _calculate_penalty(self, card):
         """Calculate strategic penalty for playing certain cards."""
-        return 10 if card.rank == "7" or card.rank == "10" or card.rank == "Ace" else 0
-    
-    def _is_playable(self, card, card_in_middle, is_initiative):
-        """Check if a card is playable in the current state."""
-        if not card_in_middle:
-            return True
-        if not is_initiative:
-            return True
-        if card.rank == "7":
-            return True
-        return card.rank == card_in_middle[-1].rank if card_in_middle else True
-    def _is_playable_light(self, card, card_in_middle):
-        """Check if a card is playable in the current state."""
-        if not card_in_middle:
-            return True
-        if card.rank == "7":
-            return True
-        return card.rank == card_in_middle[-1].rank if card_in_middle else True
-
-    def _simulate_game(self, player_hand, middle_cards, deck, opponent_hand_size, is_initiative):
-        """Simulate a game from the current state."""
-        # Create opponent's initial hand
-        opp_hand = []
-        while len(opp_hand) < opponent_hand_size and deck:
-            opp_hand.append(deck.pop(random.randrange(len(deck))))
-        #calculte who's turn it is
-        turn = is_initiative if len(middle_cards)%2 == 0 else not is_initiative
-        # Play the hand
-        hand_score, player_hand, opp_hand = self._play_hand(
-            player_hand, opp_hand, middle_cards, is_initiative,turn
-        )
-        score = hand_score
-        print(score)
-        return score
-    
-    def _play_hand(self, player_hand, opp_hand, middle_cards, is_initiative, turn):
-        """Simulate playing a single hand."""
-        #if all cards played
-        if not player_hand and not opp_hand:
-            return (sum(card.get_score() for card in middle_cards) if is_initiative 
-                   else -sum(card.get_score() for card in middle_cards)), player_hand, opp_hand
-        #if last card did not "kill" (pass condition)
-        if len(middle_cards) >= 2 and len(middle_cards) % 2 == 0 and \
-                not self._is_playable_light(middle_cards[-1], middle_cards[:-1]):
-            score = sum(card.get_score() for card in middle_cards)
-            return score if is_initiative else -score, player_hand, opp_hand
-        print("player hand\n", player_hand)
-        print("opp hand\n",opp_hand)
-        print("middle cards\n",middle_cards)
-        print("has initiative\n", is_initiative)
-        print("it is bots == 1 or opponents == 0 turn\n",turn)
-        print("----------")
-        if turn:
-            # Bot's turn
-            valid_moves = [card for card in player_hand if self._is_playable_light(card, middle_cards)]
-            #if bot has no moves
-            if not valid_moves and is_initiative:
-                print("1")
-                return -sum(card.get_score() for card in middle_cards) + -5, player_hand, opp_hand
-            #if bot has no moves but has to play
-            if not valid_moves:
-                played_card = random.choice(player_hand)
-                new_player_hand = [c for c in player_hand if c != played_card]
-                middle_cards.append(played_card)
-                print("2")
-                return -sum(card.get_score() for card in middle_cards), player_hand, opp_hand
-            #Normal play
-            if valid_moves:
-                played_card = random.choice(valid_moves)
-                new_player_hand = [c for c in player_hand if c != played_card]
-                middle_cards.append(played_card)
-                print("3")
-            return self._play_hand(new_player_hand, opp_hand, middle_cards,is_initiative, False)
-        else:
-            # Opponent's turn
-            valid_moves = [card for card in opp_hand if self._is_playable_light(card, middle_cards)]
-            if not valid_moves and not is_initiative:
-                print("4")
-                return sum(card.get_score() for card in middle_cards) + 5, player_hand, opp_hand
-            if not valid_moves:
-                played_card = random.choice(opp_hand)
-                new_opp_hand = [c for c in opp_hand if c != played_card]
-                middle_cards.append(played_card)
-                print("5")
-                return sum(card.get_score() for card in middle_cards), player_hand, opp_hand
-            else:
-                played_card = random.choice(valid_moves)
-                new_opp_hand = [c for c in opp_hand if c != played_card]
-                middle_cards.append(played_card)
-                print("6")
-            return self._play_hand(player_hand, new_opp_hand, middle_cards,is_initiative, True)
\ No newline at end of file
+        return PENALTIES[card.id]
+
+    def _play_hand(self, state):
+        """Simulate playing a single hand, returns the score for the bot."""
+        return rollout(state, self.rollout_policy, self.rollout_stats)
@@ -0,0 +1,26 @@
+import random
+from Helper.cardset import NO_CARD, card_id, to_mask, playable_mask
+
+
+class RandomBot:
+    """Plays a uniformly random legal move, passing included. A baseline opponent."""
+
+    def __init__(self, seed=None):
+        self.reseed(seed)
+
+    def reseed(self, seed):
+        self.seed = seed
+        self._rng = random.Random(seed)
+
+    def choose_move(self, player_hand, card_in_middle, cards_in_the_deck, opponent_hand_size, is_initiative,
+                    time_budget_ms=None):
+        """Same arguments and return value as MonteCarloBot.choose_move."""
+        lead = card_id(card_in_middle[0]) if card_in_middle else NO_CARD
+        playable = playable_mask(to_mask(player_hand), lead, is_initiative)
+        options = [i for i, card in enumerate(player_hand) if playable >> card_id(card) & 1]
+        if is_initiative and card_in_middle:
+            options.append(None)  # Pass
+        choice = self._rng.choice(options) if options else None
+        if choice is None:
+            return None, True
+        return choice, False
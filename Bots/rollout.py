@@ -0,0 +1,118 @@
+import logging
+from Helper.card import CARDS
+from Helper.cardset import to_cards, pile_score
+from Bots.search_state import BOT, random_card
+
+logger = logging.getLogger(__name__)
+
+# Why a rollout stopped
+NO_KILL = "no_kill"  # The non-initiative card did not kill, the initiative takes the pile
+CANNOT_ANSWER = "cannot_answer"  # The initiative has no seven or lead rank left and gives the pile away
+OUT_OF_CARDS = "out_of_cards"  # The non-initiative player has nothing left to play
+TRUNCATED = "truncated"  # Cut short and scored by a value estimate
+TERMINAL_REASONS = (NO_KILL, CANNOT_ANSWER, OUT_OF_CARDS, TRUNCATED)
+
+CANNOT_ANSWER_BONUS = 5  # Extra reward for forcing the initiative to give up the pile
+
+
+def random_policy(state, legal_mask):
+    """Rollout policy that plays a uniformly random legal card, drawn from state.rng."""
+    return random_card(legal_mask, state.rng)
+
+
+class RolloutStats:
+    """Counts rollouts, their depth in plies and why they ended.
+
+    determinize_seconds and rollout_seconds are only filled in by timed
+    simulation runs (see run_simulations).
+    """
+    __slots__ = ('rollouts', 'total_depth', 'max_depth', 'reasons', 'determinize_seconds', 'rollout_seconds')
+
+    def __init__(self):
+        self.rollouts = 0
+        self.total_depth = 0
+        self.max_depth = 0
+        self.reasons = dict.fromkeys(TERMINAL_REASONS, 0)
+        self.determinize_seconds = 0.0
+        self.rollout_seconds = 0.0
+
+    def record(self, depth, reason):
+        self.rollouts += 1
+        self.total_depth += depth
+        if depth > self.max_depth:
+            self.max_depth = depth
+        self.reasons[reason] += 1
+
+    def merge(self, other):
+        """Adds the counts of another RolloutStats, e.g. from a worker process."""
+        self.rollouts += other.rollouts
+        self.total_depth += other.total_depth
+        self.max_depth = max(self.max_depth, other.max_depth)
+        for reason, count in other.reasons.items():
+            self.reasons[reason] += count
+        self.determinize_seconds += other.determinize_seconds
+        self.rollout_seconds += other.rollout_seconds
+
+    def mean_depth(self):
+        return self.total_depth / self.rollouts if self.rollouts else 0.0
+
+    def __repr__(self):
+        return (f"RolloutStats(rollouts={self.rollouts}, mean_depth={self.mean_depth():.2f}, "
+                f"max_depth={self.max_depth}, reasons={self.reasons})")
+
+
+def end_of_hand(state):
+    """(reason, score for the bot) if the hand in state is over, else None.
+
+    The checks rollout makes at every ply, for callers that step states themselves.
+    """
+    if state.hand_over():
+        reason, bot_takes, bonus = NO_KILL, state.bot_initiative, 0
+    elif state.legal_mask():
+        return None
+    elif state.has_initiative():
+        reason, bot_takes, bonus = CANNOT_ANSWER, state.turn != BOT, CANNOT_ANSWER_BONUS
+    else:
+        reason, bot_takes, bonus = OUT_OF_CARDS, state.bot_initiative, 0
+    score = pile_score(state.middle) + bonus
+    return reason, score if bot_takes else -score
+
+
+def rollout(state, policy=random_policy, stats=None):
+    """Plays the hand in state to its end and returns the score for the bot.
+
+    policy(state, legal_mask) picks the card id to play. The state is walked
+    forward with apply and restored with undo, so it is unchanged on return.
+    Every ply is logged at DEBUG level; the check is made once per rollout.
+    """
+    trace = logger.isEnabledFor(logging.DEBUG)
+    depth = 0
+    while True:
+        if state.hand_over():
+            reason, bot_takes, bonus = NO_KILL, state.bot_initiative, 0
+            break
+        legal = state.legal_mask()
+        if not legal:
+            if state.has_initiative():
+                reason, bot_takes, bonus = CANNOT_ANSWER, state.turn != BOT, CANNOT_ANSWER_BONUS
+            else:
+                reason, bot_takes, bonus = OUT_OF_CARDS, state.bot_initiative, 0
+            break
+        card = policy(state, legal)
+        if trace:
+            logger.debug("ply %d: %s plays %s on %s, bot hand %s, opponent hand %s", depth,
+                         "bot" if state.turn == BOT else "opponent", CARDS[card], to_cards(state.middle),
+                         to_cards(state.hands[0]), to_cards(state.hands[1]))
+        state.apply(card)
+        depth += 1
+
+    score = pile_score(state.middle) + bonus
+    if not bot_takes:
+        score = -score
+    if stats is not None:
+        stats.record(depth, reason)
+    if trace:
+        logger.debug("rollout ended after %d plies (%s), score %d", depth, reason, score)
+    for _ in range(depth):
+        state.undo(state.last)
+    return score
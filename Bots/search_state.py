@@ -0,0 +1,68 @@
+import random
+from Helper.cardset import NUM_CARDS, NO_CARD, KILL_MASKS, LEGAL_MASKS
+
+BOT = 0
+OPPONENT = 1
+
+
+def random_card(mask, rng=random):
+    """Picks a uniformly random card id out of a non-empty card set without building a list."""
+    for _ in range(rng.randrange(mask.bit_count())):
+        mask &= mask - 1
+    return (mask & -mask).bit_length() - 1
+
+
+class SearchState:
+    """Mutable position of the hand being simulated by a bot.
+
+    Moves are made with apply(card) and taken back with undo(card), so a
+    rollout walks down and back up the same object instead of copying hands
+    and piles at every ply. hands[BOT] is the bot's hand, hands[OPPONENT] the
+    (sampled) opponent hand. rng (random.Random or the random module) is the
+    stream random rollout policies draw from.
+    """
+    __slots__ = ('hands', 'middle', 'middle_len', 'lead', 'last', 'bot_initiative', 'turn', 'rng', '_last_stack')
+
+    def __init__(self, bot_hand, opp_hand, middle, lead, last, middle_len, bot_initiative, rng=random):
+        self.hands = [bot_hand, opp_hand]
+        self.middle = middle
+        self.middle_len = middle_len
+        self.lead = lead
+        self.last = last
+        self.bot_initiative = bot_initiative
+        # The initiative plays on even pile sizes, the other player on odd ones
+        self.turn = BOT if (middle_len % 2 == 0) == bot_initiative else OPPONENT
+        self.rng = rng
+        self._last_stack = [NO_CARD] * (NUM_CARDS + 1)  # Previous top card for every pile size
+
+    def has_initiative(self):
+        """True if the player to move has the initiative."""
+        return (self.turn == BOT) == self.bot_initiative
+
+    def legal_mask(self):
+        return self.hands[self.turn] & LEGAL_MASKS[self.has_initiative()][self.lead]
+
+    def hand_over(self):
+        """True if the last non-initiative card did not kill, the initiative takes the pile."""
+        return self.middle_len > 0 and self.middle_len % 2 == 0 and not KILL_MASKS[self.lead] >> self.last & 1
+
+    def apply(self, card):
+        bit = 1 << card
+        self.hands[self.turn] ^= bit
+        self.middle |= bit
+        self._last_stack[self.middle_len] = self.last
+        self.middle_len += 1
+        if self.lead == NO_CARD:
+            self.lead = card
+        self.last = card
+        self.turn ^= 1
+
+    def undo(self, card):
+        bit = 1 << card
+        self.turn ^= 1
+        self.middle_len -= 1
+        self.last = self._last_stack[self.middle_len]
+        if self.middle_len == 0:
+            self.lead = NO_CARD
+        self.middle ^= bit
+        self.hands[self.turn] |= bit
@@ -0,0 +1,109 @@
+from Helper.engine import PASS
+from Bots.rollout import RolloutStats
+
+# How a decision was made
+SIMULATION = "simulation"  # Monte Carlo rollouts
+ENDGAME = "endgame"  # Exact solve of an empty-deck position
+FORCED = "forced"  # Only one thing to do, nothing was searched
+CACHED = "cached"  # Enough simulations of the position were in the decision cache
+
+
+class SearchStats:
+    """Cost and outcome of one choose_move call.
+
+    Times are in seconds: determinize is dealing the opponent hands, rollout
+    is playing the hands out (both summed over worker processes) and scoring
+    is turning the sums into move values.
+    moves maps each option (card id or PASS) to (visits, mean score, variance).
+    """
+
+    def __init__(self, method=SIMULATION):
+        self.method = method
+        self.simulations = 0  # Rollouts per move
+        self.rollouts = RolloutStats()
+        self.seconds = 0.0
+        self.scoring_seconds = 0.0
+        self.moves = {}
+        self.score_margin = None
+        self.margin_z = None
+
+    @property
+    def determinize_seconds(self):
+        return self.rollouts.determinize_seconds
+
+    @property
+    def rollout_seconds(self):
+        return self.rollouts.rollout_seconds
+
+    def rollouts_per_second(self):
+        return self.rollouts.rollouts / self.seconds if self.seconds else 0.0
+
+    def as_dict(self):
+        """Plain values only, ready for json.dumps."""
+        return {
+            "method": self.method,
+            "simulations": self.simulations,
+            "rollouts": self.rollouts.rollouts,
+            "rollouts_per_second": self.rollouts_per_second(),
+            "mean_depth": self.rollouts.mean_depth(),
+            "max_depth": self.rollouts.max_depth,
+            "seconds": self.seconds,
+            "determinize_seconds": self.determinize_seconds,
+            "rollout_seconds": self.rollout_seconds,
+            "scoring_seconds": self.scoring_seconds,
+            "moves": {("pass" if move == PASS else str(move)): {"visits": v, "mean": m, "variance": var}
+                      for move, (v, m, var) in self.moves.items()},
+            "score_margin": self.score_margin,
+            "margin_z": self.margin_z,
+        }
+
+    def __repr__(self):
+        return (f"SearchStats({self.method}, simulations={self.simulations}, seconds={self.seconds:.4f}, "
+                f"rollouts/s={self.rollouts_per_second():.0f}, determinize={self.determinize_seconds:.4f}, "
+                f"rollout={self.rollout_seconds:.4f}, scoring={self.scoring_seconds:.4f}, {self.rollouts})")
+
+
+class MatchStats:
+    """Totals of the SearchStats of many decisions, e.g. one match."""
+
+    def __init__(self):
+        self.decisions = 0
+        self.methods = {SIMULATION: 0, ENDGAME: 0, FORCED: 0, CACHED: 0}
+        self.simulations = 0
+        self.rollouts = RolloutStats()
+        self.seconds = 0.0
+        self.scoring_seconds = 0.0
+        self.max_seconds = 0.0  # Slowest single decision
+
+    def add(self, stats):
+        self.decisions += 1
+        self.methods[stats.method] += 1
+        self.simulations += stats.simulations
+        self.rollouts.merge(stats.rollouts)
+        self.seconds += stats.seconds
+        self.scoring_seconds += stats.scoring_seconds
+        self.max_seconds = max(self.max_seconds, stats.seconds)
+
+    def mean_seconds(self):
+        return self.seconds / self.decisions if self.decisions else 0.0
+
+    def as_dict(self):
+        return {
+            "decisions": self.decisions,
+            "methods": dict(self.methods),
+            "simulations": self.simulations,
+            "rollouts": self.rollouts.rollouts,
+            "rollouts_per_second": self.rollouts.rollouts / self.seconds if self.seconds else 0.0,
+            "mean_depth": self.rollouts.mean_depth(),
+            "max_depth": self.rollouts.max_depth,
+            "seconds": self.seconds,
+            "mean_seconds": self.mean_seconds(),
+            "max_seconds": self.max_seconds,
+            "determinize_seconds": self.rollouts.determinize_seconds,
+            "rollout_seconds": self.rollouts.rollout_seconds,
+            "scoring_seconds": self.scoring_seconds,
+        }
+
+    def __repr__(self):
+        return (f"MatchStats(decisions={self.decisions}, seconds={self.seconds:.3f}, "
+                f"mean={self.mean_seconds() * 1000:.2f}ms, max={self.max_seconds * 1000:.2f}ms, {self.rollouts})")
@@ -0,0 +1,68 @@
+import pygame
+
+# What a scene can return besides the next scene to show
+BACK = None  # Return to the scene below
+EXIT = "exit"  # Close the application
+
+
+class App:
+    """One window shared by all screens of the game, with a stack of scenes.
+
+    A scene is a callable scene(app) that runs until it is done and returns
+    the next scene to push on the stack, BACK or EXIT. It is called again
+    whenever it gets back to the top. Fonts and anything expensive to build,
+    such as bots with their worker pools, are created once and shared
+    through font and shared.
+    """
+
+    def __init__(self):
+        pygame.init()
+        self.screen = None
+        self.clock = pygame.time.Clock()
+        self._fonts = {}
+        self._shared = {}
+        self.stack = []
+
+    def display(self, size, caption):
+        """The window surface at the given size, resized only if it changed."""
+        if self.screen is None or self.screen.get_size() != tuple(size):
+            self.screen = pygame.display.set_mode(size)
+        pygame.display.set_caption(caption)
+        return self.screen
+
+    def font(self, name, size, system=False):
+        key = (name, size, system)
+        font = self._fonts.get(key)
+        if font is None:
+            font = self._fonts[key] = pygame.font.SysFont(name, size) if system else pygame.font.Font(name, size)
+        return font
+
+    def shared(self, key, factory):
+        """The object stored under key, made with factory() the first time it is asked for."""
+        if key not in self._shared:
+            self._shared[key] = factory()
+        return self._shared[key]
+
+    def run(self, scene):
+        """Shows scene and whatever it leads to until the stack is empty or a scene returns EXIT."""
+        self.stack = [scene]
+        try:
+            while self.stack:
+                result = self.stack[-1](self)
+                if result is EXIT:
+                    break
+                if result is BACK:
+                    self.stack.pop()
+                else:
+                    self.stack.append(result)
+        finally:
+            self.close()
+
+    def close(self):
+        """Shuts down shared objects that hold resources (bot worker pools) and the window."""
+        for obj in self._shared.values():
+            close = getattr(obj, "close", None)
+            if close is not None:
+                close()
+        self._shared.clear()
+        pygame.quit()
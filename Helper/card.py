@@ -1,12 +1,60 @@
+SUITS = ['Hearts', 'Diamonds', 'Clubs', 'Spades']
+RANKS = ['7', '8', '9', '10', 'Jack', 'Queen', 'King', 'Ace']
+RANK_SCORES = {'10': 10, 'Ace': 10}
+
 class Card:
-    def __init__(self, rank, suit):
-        self.rank = rank
-        self.suit = suit
+    """Immutable playing card.
+
+    There are exactly 32 Card instances, one per card of the deck, and Card(rank, suit)
+    returns the existing one. Card ids follow the Deck order: suit index * 8 + rank index.
+    """
+    __slots__ = ('rank', 'suit', 'id', 'rank_index', 'score')
+
+    def __new__(cls, rank, suit):
+        try:
+            return _INTERNED[rank, suit]
+        except KeyError:
+            raise ValueError(f"No such card: {rank} of {suit}") from None
+
+    @classmethod
+    def _create(cls, rank, suit):
+        card = object.__new__(cls)
+        object.__setattr__(card, 'rank', rank)
+        object.__setattr__(card, 'suit', suit)
+        object.__setattr__(card, 'rank_index', RANKS.index(rank))
+        object.__setattr__(card, 'id', SUITS.index(suit) * len(RANKS) + card.rank_index)
+        object.__setattr__(card, 'score', RANK_SCORES.get(rank, 0))
+        return card
+
+    @staticmethod
+    def from_id(card_id):
+        return CARDS[card_id]
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Card is immutable")
+
+    def __eq__(self, other):
+        return self is other
+
+    def __hash__(self):
+        return self.id
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return Card, (self.rank, self.suit)
 
     def __repr__(self):
         return f"{self.rank} of {self.suit}"
     
     def get_score(self):
-        if self.rank in ["Ace",'10']:
-            return 10
-        return 0
\ No newline at end of file
+        return self.score
+
+
+CARDS = tuple(Card._create(rank, suit) for suit in SUITS for rank in RANKS)  # Indexed by card id
+_INTERNED = {(card.rank, card.suit): card for card in CARDS}
+CARD_SCORES = tuple(card.score for card in CARDS)
\ No newline at end of file
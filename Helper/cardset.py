@@ -0,0 +1,90 @@
+"""Card sets as 32-bit integers.
+
+Every card gets one bit, card id = suit index * 8 + rank index, which is the
+order Deck.__init__ builds the deck in. Hands, the middle pile and the unseen
+cards are plain ints, so set operations are bit operations and counting is a
+popcount.
+"""
+from Helper.card import CARDS, SUITS, RANKS
+
+NUM_CARDS = len(SUITS) * len(RANKS)
+NUM_RANKS = len(RANKS)
+FULL_DECK = (1 << NUM_CARDS) - 1
+NO_CARD = -1
+CARD_POINTS = 10
+
+RANK_MASKS = [sum(1 << (suit * NUM_RANKS + rank) for suit in range(len(SUITS))) for rank in range(NUM_RANKS)]
+SEVENS = RANK_MASKS[RANKS.index('7')]
+SCORE_MASK = RANK_MASKS[RANKS.index('10')] | RANK_MASKS[RANKS.index('Ace')]
+# Cards that kill a pile, indexed by the id of the lead card
+KILL_MASKS = [RANK_MASKS[i % NUM_RANKS] | SEVENS for i in range(NUM_CARDS)]
+
+PASS = NUM_CARDS  # Action used by the initiative player to give up the middle pile
+PASS_BIT = 1 << PASS
+NUM_ACTIONS = NUM_CARDS + 1
+# Legal actions indexed by [is_initiative][lead card id], anded with hand | PASS_BIT.
+# NO_CARD (-1) picks the last entry, the empty pile, where any card may be played.
+# Answering the lead is the only case with a restriction and the only one with PASS.
+LEGAL_MASKS = (
+    (FULL_DECK,) * (NUM_CARDS + 1),
+    tuple(KILL_MASKS[lead] | PASS_BIT for lead in range(NUM_CARDS)) + (FULL_DECK,),
+)
+
+
+def card_id(card):
+    return card.id
+
+
+def card_from_id(i):
+    return CARDS[i]
+
+
+def to_mask(cards):
+    """Converts a list of Card objects to a card set."""
+    mask = 0
+    for card in cards:
+        mask |= 1 << card.id
+    return mask
+
+
+def card_ids(mask):
+    """Returns the ids of the bits set in mask, lowest first."""
+    ids = []
+    while mask:
+        low = mask & -mask
+        ids.append(low.bit_length() - 1)
+        mask ^= low
+    return ids
+
+
+def to_cards(mask):
+    """Converts a card set to a list of Card objects, ordered by id."""
+    return [CARDS[i] for i in card_ids(mask)]
+
+
+def popcount(mask):
+    return mask.bit_count()
+
+
+def pile_score(mask):
+    """Points in a set of cards, every 10 and Ace is worth CARD_POINTS."""
+    return CARD_POINTS * (mask & SCORE_MASK).bit_count()
+
+
+def kills(card, lead):
+    """Returns True if card id beats the lead card id (same rank or a seven)."""
+    return bool(KILL_MASKS[lead] >> card & 1)
+
+
+def legal_action_mask(hand, lead, is_initiative):
+    """Legal actions (card ids and PASS) of a player holding hand, see LEGAL_MASKS."""
+    return (hand | PASS_BIT) & LEGAL_MASKS[is_initiative][lead]
+
+
+def playable_mask(hand, lead, is_initiative):
+    """Cards of hand that may go on a pile led by lead (NO_CARD if it is empty).
+
+    The non-initiative player may play anything, the initiative player has to
+    open the pile or answer with a seven or the rank of the lead card.
+    """
+    return hand & LEGAL_MASKS[is_initiative][lead]
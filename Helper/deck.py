@@ -1,12 +1,11 @@
 import random
 import csv
-from Helper.card import Card
+from Helper.card import CARDS
 
 class Deck:
-    def __init__(self):
-        suits = ['Hearts', 'Diamonds', 'Clubs', 'Spades']
-        ranks = ['7', '8', '9', '10', 'Jack', 'Queen', 'King', 'Ace']
-        self.cards = [Card(rank, suit) for suit in suits for rank in ranks]
+    def __init__(self, rng=random):
+        self.cards = list(CARDS)  # The shared Card instances, in id order
+        self.rng = rng  # random.Random (or the random module) used to shuffle
 
     def __len__(self):
         return len(self.cards)
@@ -17,7 +16,7 @@ class Deck:
         
     def shuffle_deck(self):
         """Shuffles the deck of cards"""
-        random.shuffle(self.cards)
+        self.rng.shuffle(self.cards)
     
     def cut_deck(self, number):
         """Cuts the deck by moving the top 'number' of cards to the bottom of the deck."""
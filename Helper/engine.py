@@ -0,0 +1,167 @@
+import random
+from Helper.deck import Deck
+from Helper.cardset import (NO_CARD, KILL_MASKS, LEGAL_MASKS, PASS, PASS_BIT, card_ids,
+                            card_from_id, to_cards, pile_score)
+
+WINNING_POINTS = 510
+HAND_SIZE = 4
+
+
+class GameState:
+    """Headless Sedmice game played to WINNING_POINTS between player 0 and player 1.
+
+    Hands and the middle pile are card sets (see Helper.cardset). Actions are
+    the id of the card to play, or PASS. Player 0 is "Player 1" in the GUI and
+    player 1 is "Player 2". Trackers (see Helper.tracker) are told about every
+    new deck, draw and play. rng (random.Random or the random module) picks
+    the initiative and shuffles every deck.
+    """
+
+    def __init__(self, initiative=None, cut=0, deck=None, trackers=(), rng=random):
+        self.rng = rng
+        if initiative is None:
+            initiative = rng.choice((0, 1))
+        if deck is None:
+            deck = Deck(rng)
+            deck.shuffle_deck()
+            deck.cut_deck(cut)
+        self.deck = deck
+        self.hands = [0, 0]
+        self.points = [0, 0]
+        self.round_points = [0, 0]  # Points taken from the current deck, decides the next initiative
+        self.middle = 0
+        self.middle_len = 0
+        self.pile = []  # Card ids of the middle pile in the order they were played
+        self.lead = NO_CARD  # First card of the middle pile
+        self.last = NO_CARD  # Card on top of the middle pile
+        self.initiative = initiative
+        self.current = initiative
+        self.winner = None
+        self.trackers = list(trackers)
+        self._deal()
+
+    def _deal(self):
+        """Deals HAND_SIZE cards to each player, Player 1 first, like run_game."""
+        for player in (0, 1):
+            self._draw(player, min(HAND_SIZE, len(self.deck.cards)))
+
+    def _draw(self, player, num):
+        cards = self.deck.cards
+        hand = self.hands[player]
+        for _ in range(num):
+            card = cards.pop().id
+            hand |= 1 << card
+            for tracker in self.trackers:
+                tracker.on_draw(player, card)
+        self.hands[player] = hand
+
+    def legal_mask(self):
+        """Returns the legal actions for the player to move as a bit mask, PASS is bit PASS."""
+        if self.winner is not None:
+            return 0
+        return (self.hands[self.current] | PASS_BIT) & LEGAL_MASKS[self.current == self.initiative][self.lead]
+
+    def legal_actions(self):
+        """Returns the list of legal actions for the player to move."""
+        return card_ids(self.legal_mask())
+
+    def is_legal(self, action):
+        return 0 <= action <= PASS and bool(self.legal_mask() >> action & 1)
+
+    def step(self, action):
+        """Applies an action.
+
+        Returns the player who took the middle pile, or None if the hand goes on.
+        """
+        if action == PASS:
+            # The initiative player gives up, the last card killed so the pile changes hands
+            return self._end_hand(1 - self.initiative)
+        bit = 1 << action
+        self.hands[self.current] ^= bit
+        for tracker in self.trackers:
+            tracker.on_play(self.current, action)
+        self.middle |= bit
+        self.middle_len += 1
+        self.pile.append(action)
+        self.last = action
+        if self.current == self.initiative:
+            if self.lead == NO_CARD:
+                self.lead = action
+            self.current = 1 - self.current
+            return None
+        if not KILL_MASKS[self.lead] & bit:
+            return self._end_hand(self.initiative)
+        self.current = self.initiative
+        return None
+
+    def _end_hand(self, taker):
+        """Awards the middle pile, refills the hands and starts the next hand."""
+        score = pile_score(self.middle)
+        self.points[taker] += score
+        self.round_points[taker] += score
+        if self.points[taker] >= WINNING_POINTS:
+            self.winner = taker
+            return taker
+        left = len(self.deck.cards)
+        num = left // 2 if self.middle_len > left else self.middle_len // 2
+        self._draw(taker, num)
+        self._draw(1 - taker, num)
+        self.middle = 0
+        self.middle_len = 0
+        self.pile = []
+        self.lead = NO_CARD
+        self.last = NO_CARD
+        self.initiative = taker
+        if not self.hands[0] and not self.hands[1]:
+            self._new_round()
+        self.current = self.initiative
+        return taker
+
+    def _new_round(self):
+        """Both hands are empty: shuffle a fresh deck, the better scorer gets the initiative."""
+        self.deck = self._next_deck()
+        if self.round_points[0] > self.round_points[1]:
+            self.initiative = 0
+        elif self.round_points[1] > self.round_points[0]:
+            self.initiative = 1
+        self.round_points = [0, 0]
+        for tracker in self.trackers:
+            tracker.on_new_deck()
+        self._deal()
+
+    def _next_deck(self):
+        """Deck for a new round, a replay overrides this to use the recorded order."""
+        deck = Deck(self.rng)
+        deck.shuffle_deck()
+        return deck
+
+    def is_terminal(self):
+        return self.winner is not None
+
+    def scores(self):
+        """Returns the total points of both players."""
+        return tuple(self.points)
+
+    def unseen_mask(self, player):
+        """Cards the given player has not seen: opponent's hand and the rest of the deck."""
+        mask = self.hands[1 - player]
+        for card in self.deck.cards:
+            mask |= 1 << card.id
+        return mask
+
+    def hand_cards(self, player):
+        """Returns the hand of the player as Card objects."""
+        return to_cards(self.hands[player])
+
+    def middle_cards(self):
+        """Returns the middle pile as Card objects in play order, lead card first and top card last."""
+        return [card_from_id(cid) for cid in self.pile]
+
+
+def play_random_game(initiative=None, cut=0, rng=random):
+    """Plays a full game with uniformly random legal moves and returns the final state."""
+    state = GameState(initiative, cut, rng=rng)
+    choice = rng.choice
+    while state.winner is None:
+        state.step(choice(state.legal_actions()))
+    return state
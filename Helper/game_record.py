@@ -0,0 +1,228 @@
+"""Compact binary records of whole games and their replay through the engine.
+
+A log file is the header b"SEDM" plus a version byte, followed by one record
+per game:
+
+    u16  length of the rest of the record
+    u8   initiative at the start (0 or 1)
+    u8   cut number used on the first deck
+    u8   number of decks
+    u16  number of actions
+    15 bytes per deck: the deck order (before the cut for the first deck) as a Lehmer code
+    the actions as one little endian integer
+
+Every action is stored as its index among the legal actions, packed as a
+mixed radix number with the number of legal actions as base, so forced moves
+take no space. A full game to 510 (about 11 decks and 370 actions) takes
+around 250 bytes. Decoding the actions needs the engine, see replay.
+"""
+import os
+import struct
+from Helper.card import CARDS
+from Helper.cardset import NUM_CARDS
+from Helper.deck import Deck
+from Helper.engine import GameState
+
+MAGIC = b"SEDM"
+VERSION = 1
+PERMUTATION_BYTES = 15  # 32! < 2 ** 118
+_HEADER = struct.Struct("<BBBH")
+_LENGTH = struct.Struct("<H")
+
+
+def encode_permutation(ids):
+    """Lehmer code of an ordering of all card ids."""
+    remaining = list(range(NUM_CARDS))
+    code = 0
+    for cid in ids:
+        i = remaining.index(cid)
+        code = code * len(remaining) + i
+        remaining.pop(i)
+    return code.to_bytes(PERMUTATION_BYTES, "little")
+
+
+def decode_permutation(data):
+    code = int.from_bytes(data, "little")
+    digits = []
+    for base in range(1, NUM_CARDS + 1):
+        code, digit = divmod(code, base)
+        digits.append(digit)
+    remaining = list(range(NUM_CARDS))
+    return [remaining.pop(digit) for digit in reversed(digits)]
+
+
+def _uncut(ids, number):
+    """Undoes Deck.cut_deck(number)."""
+    if 0 < number < len(ids):
+        return ids[-number:] + ids[:-number]
+    return ids
+
+
+class GameRecord:
+    """One game: the starting initiative, the cut, every deck order and the packed actions.
+
+    decks hold card ids in Deck.cards order, the first one before it was cut.
+    """
+
+    def __init__(self, initiative, cut, decks, num_actions, action_code):
+        self.initiative = initiative
+        self.cut = cut
+        self.decks = decks
+        self.num_actions = num_actions
+        self.action_code = action_code
+
+    def to_bytes(self):
+        actions = self.action_code.to_bytes((self.action_code.bit_length() + 7) // 8, "little")
+        body = (_HEADER.pack(self.initiative, self.cut, len(self.decks), self.num_actions)
+                + b"".join(encode_permutation(deck) for deck in self.decks) + actions)
+        return _LENGTH.pack(len(body)) + body
+
+    @classmethod
+    def from_bytes(cls, body):
+        """Parses a record without its length prefix."""
+        initiative, cut, num_decks, num_actions = _HEADER.unpack_from(body)
+        offset = _HEADER.size
+        decks = []
+        for _ in range(num_decks):
+            decks.append(decode_permutation(body[offset:offset + PERMUTATION_BYTES]))
+            offset += PERMUTATION_BYTES
+        return cls(initiative, cut, decks, num_actions, int.from_bytes(body[offset:], "little"))
+
+
+class GameRecorder:
+    """Builds a GameRecord while a game is played.
+
+    Pass it to GameState as a tracker to capture the decks from the draws and
+    call add_action before every state.step.
+    """
+
+    def __init__(self, initiative, cut=0):
+        self.initiative = initiative
+        self.cut = cut
+        self._draws = []  # Card ids in the order they were drawn, one list per deck
+        self._digits = []  # (index among the legal actions, number of legal actions)
+        self.on_new_deck()
+
+    def on_new_deck(self):
+        self._draws.append([])
+
+    def on_draw(self, player, card):
+        self._draws[-1].append(card)
+
+    def on_play(self, player, card):
+        pass
+
+    def add_action(self, state, action):
+        legal = state.legal_actions()
+        self._digits.append((legal.index(action), len(legal)))
+
+    def record(self):
+        decks = []
+        for draws in self._draws:
+            # Cards are drawn from the end of the deck, the ones never drawn go first
+            undrawn = sorted(set(range(NUM_CARDS)).difference(draws))
+            decks.append(undrawn + draws[::-1])
+        decks[0] = _uncut(decks[0], self.cut)
+        code = 0
+        for digit, base in reversed(self._digits):
+            code = code * base + digit
+        return GameRecord(self.initiative, self.cut, decks, len(self._digits), code)
+
+
+class GameLogWriter:
+    """Appends records to a log file, writing the file header if the file is new."""
+
+    def __init__(self, path):
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, "ab")
+        if new:
+            self.file.write(MAGIC + bytes([VERSION]))
+
+    def write(self, record):
+        self.file.write(record.to_bytes())
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def append_game(path, record):
+    with GameLogWriter(path) as writer:
+        writer.write(record)
+
+
+def read_games(path):
+    """Yields the GameRecords of a log file one at a time."""
+    with open(path, "rb") as file:
+        header = file.read(len(MAGIC) + 1)
+        if header[:len(MAGIC)] != MAGIC or header[len(MAGIC):] != bytes([VERSION]):
+            raise ValueError(f"{path} is not a version {VERSION} game log")
+        while True:
+            prefix = file.read(_LENGTH.size)
+            if not prefix:
+                return
+            if len(prefix) < _LENGTH.size:
+                raise ValueError(f"{path} ends with a truncated record")
+            length, = _LENGTH.unpack(prefix)
+            body = file.read(length)
+            if len(body) < length:
+                raise ValueError(f"{path} ends with a truncated record")
+            yield GameRecord.from_bytes(body)
+
+
+def _deck_of(ids):
+    deck = Deck()
+    deck.cards = [CARDS[cid] for cid in ids]
+    return deck
+
+
+class ReplayState(GameState):
+    """GameState that deals the decks of a record instead of shuffling."""
+
+    def __init__(self, record, trackers=()):
+        self._decks = iter(record.decks[1:])
+        deck = _deck_of(record.decks[0])
+        deck.cut_deck(record.cut)
+        super().__init__(record.initiative, deck=deck, trackers=trackers)
+
+    def _next_deck(self):
+        return _deck_of(next(self._decks))
+
+
+def replay_steps(record, trackers=()):
+    """Replays a record, yielding (state, action) after every action.
+
+    The same state object is yielded every time, copy what needs to be kept.
+    """
+    state = ReplayState(record, trackers)
+    code = record.action_code
+    for _ in range(record.num_actions):
+        legal = state.legal_actions()
+        code, digit = divmod(code, len(legal))
+        action = legal[digit]
+        state.step(action)
+        yield state, action
+
+
+def replay(record, num_actions=None, trackers=()):
+    """The state after the first num_actions actions of a record (all by default)."""
+    if num_actions == 0:
+        return ReplayState(record, trackers)
+    state = None
+    for i, (state, _) in enumerate(replay_steps(record, trackers), 1):
+        if i == num_actions:
+            break
+    return state if state is not None else ReplayState(record, trackers)
+
+
+if __name__ == "__main__":
+    import sys
+    for number, record in enumerate(read_games(sys.argv[1])):
+        final = replay(record)
+        result = f"player {final.winner + 1} won" if final.winner is not None else "unfinished"
+        print(f"game {number}: {record.num_actions} actions, {result}, points {final.scores()}")
@@ -25,7 +25,7 @@ class Player:
         """Prints the player's current hand."""
         print(f"{self.name}'s hand:")
         for i, card in enumerate(self.hand):
-            print(f"{i}: {card['rank']} of {card['suit']}")
+            print(f"{i}: {card}")
 
     def has_cards(self):
         """Returns True if the player has cards in their hand, else False."""
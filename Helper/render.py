@@ -0,0 +1,97 @@
+import pygame
+from Helper.card import CARDS
+
+
+class TableRenderer:
+    """Draws the hands, the middle card and the pass button of a game window.
+
+    The 32 card faces and the button are rendered once. Every draw call only
+    repaints the card slots that changed since the previous one and pushes
+    just those rectangles to the display.
+    """
+
+    def __init__(self, screen, font, button_font, hand_origins, middle_center, button_rect, card_size=(180, 180),
+                 card_gap=70, bg_color='darkgreen', card_color='white', font_color='black',
+                 button_color='darkgrey', button_text_color='black', button_text='Pass the Turn'):
+        self.screen = screen
+        self.hand_origins = hand_origins  # Top left corner of the first card of each player
+        self.card_size = card_size
+        self.card_gap = card_gap
+        self.bg_color = pygame.Color(bg_color)
+        self.button_rect = pygame.Rect(button_rect)
+        self.middle_rect = pygame.Rect((0, 0), card_size)
+        self.middle_rect.center = middle_center
+
+        self.faces = []
+        for card in CARDS:
+            face = pygame.Surface(card_size)
+            face.fill(card_color)
+            text = font.render(f"{card.rank} of {card.suit}", True, font_color)
+            face.blit(text, text.get_rect(center=face.get_rect().center))
+            self.faces.append(face.convert() if pygame.display.get_surface() else face)
+        self.button = pygame.Surface(self.button_rect.size)
+        self.button.fill(button_color)
+        text = button_font.render(button_text, True, button_text_color)
+        self.button.blit(text, text.get_rect(center=self.button.get_rect().center))
+
+        self._slot_rects = {}
+        self.invalidate()
+
+    def invalidate(self, screen=None):
+        """Repaints the whole window on the next draw, e.g. after it was uncovered.
+
+        A new screen surface can be given when the renderer is reused for another game.
+        """
+        if screen is not None:
+            self.screen = screen
+        self._hands = None
+        self._middle = None
+
+    def slot_rect(self, player, index):
+        key = (player, index)
+        rect = self._slot_rects.get(key)
+        if rect is None:
+            x, y = self.hand_origins[player]
+            rect = self._slot_rects[key] = pygame.Rect(x + index * (self.card_size[0] + self.card_gap), y,
+                                                       *self.card_size)
+        return rect
+
+    def draw(self, hands, middle_card):
+        """Shows hands (lists of Cards, one per player) and middle_card (a Card or None).
+
+        Returns the card rectangles of every hand, for hit testing clicks.
+        """
+        dirty = []
+        ids = [[card.id for card in hand] for hand in hands]
+        middle = middle_card.id if middle_card is not None else None
+        if self._hands is None:
+            self.screen.fill(self.bg_color)
+            self.screen.blit(self.button, self.button_rect)
+            dirty.append(self.screen.get_rect())
+            old_hands = [[] for _ in ids]
+            self._paint(self.middle_rect, middle)
+        else:
+            old_hands = self._hands
+            if middle != self._middle:
+                self._paint(self.middle_rect, middle)
+                dirty.append(self.middle_rect)
+
+        for player, (new, old) in enumerate(zip(ids, old_hands)):
+            for index in range(max(len(new), len(old))):
+                card = new[index] if index < len(new) else None
+                if index < len(old) and old[index] == card:
+                    continue
+                rect = self.slot_rect(player, index)
+                self._paint(rect, card)
+                dirty.append(rect)
+
+        self._hands, self._middle = ids, middle
+        if dirty:
+            pygame.display.update(dirty)
+        return [[self.slot_rect(player, index) for index in range(len(hand))] for player, hand in enumerate(ids)]
+
+    def _paint(self, rect, card):
+        if card is None:
+            self.screen.fill(self.bg_color, rect)
+        else:
+            self.screen.blit(self.faces[card], rect)
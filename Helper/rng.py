@@ -0,0 +1,20 @@
+"""Independent random streams, so a game can be reproduced on its own.
+
+Every stream is named by the master seed and a few keys, e.g.
+stream(master_seed, game_id, "deck"). The name is hashed into the seed, so a
+stream does not depend on how many other streams were used before it or in
+which process it is created.
+"""
+import hashlib
+import random
+
+
+def derive_seed(master_seed, *keys):
+    """64 bit seed of the stream named by master_seed and keys."""
+    data = repr((master_seed,) + keys).encode()
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def stream(master_seed, *keys):
+    """random.Random for the stream named by master_seed and keys."""
+    return random.Random(derive_seed(master_seed, *keys))
@@ -0,0 +1,57 @@
+import random
+from Helper.cardset import NUM_CARDS, FULL_DECK, card_ids, to_cards
+
+
+class CardTracker:
+    """What one player can know about the cards of the current deck.
+
+    Attach it to a GameState (GameState(..., trackers=[tracker])) and the
+    engine reports every draw and play. The tracker only uses what its player
+    sees: its own draws, the opponent's hand size and the played cards. The
+    unseen set is exactly the opponent's hand plus the rest of the deck.
+    """
+
+    def __init__(self, player):
+        self.player = player
+        self.on_new_deck()
+
+    def on_new_deck(self):
+        self.hand = 0
+        self.played = 0  # Cards that went to the middle since the deck was shuffled
+        self.unseen = FULL_DECK
+        self.deck_size = NUM_CARDS
+        self.opponent_hand_size = 0
+
+    def on_draw(self, player, card):
+        """A card was drawn, the tracker only looks at it if its own player drew it."""
+        self.deck_size -= 1
+        if player == self.player:
+            self.hand |= 1 << card
+            self.unseen &= ~(1 << card)
+        else:
+            self.opponent_hand_size += 1
+
+    def on_play(self, player, card):
+        bit = 1 << card
+        if player == self.player:
+            self.hand &= ~bit
+        else:
+            if not self.unseen & bit:
+                raise ValueError(f"Opponent played card {card} that cannot be in their hand")
+            self.unseen &= ~bit
+            self.opponent_hand_size -= 1
+        self.played |= bit
+
+    def deck_empty(self):
+        """True once the opponent's hand is exactly the unseen cards."""
+        return self.deck_size == 0
+
+    def unseen_cards(self):
+        return to_cards(self.unseen)
+
+    def sample_opponent_hand(self, rng=random):
+        """Deals the opponent a hand that is consistent with everything seen so far."""
+        hand = 0
+        for card in rng.sample(card_ids(self.unseen), self.opponent_hand_size):
+            hand |= 1 << card
+        return hand
@@ -0,0 +1,161 @@
+"""Self-play trajectories stored as fixed-size NumPy shards on disk.
+
+Each shard is a .npy file holding a structured array of TRANSITION_DTYPE
+rows. TrajectoryWriter fills one shard in memory and saves it once full, so
+writing takes shard_size rows of memory. TrajectoryDataset memory-maps the
+shards and yields shuffled minibatches, reading only the rows it returns.
+
+    python -m RL.dataset data/ --steps 10000000 --envs 512
+"""
+import argparse
+import glob
+import os
+import numpy as np
+from Helper.cardset import NUM_ACTIONS
+from RL.vec_env import VecSedmiceEnv, OBS_SIZE
+
+# One row per action taken. The observation and mask are the ones the action
+# was chosen from, reward is the points of the hand it ended for the acting
+# player and done marks the last action of a game.
+TRANSITION_DTYPE = np.dtype([
+    ("obs", np.float16, (OBS_SIZE,)),
+    ("mask", np.bool_, (NUM_ACTIONS,)),
+    ("action", np.int8),
+    ("reward", np.float32),
+    ("done", np.bool_),
+])
+SHARD_PATTERN = "shard_{:06d}.npy"
+
+
+def shard_paths(directory):
+    return sorted(glob.glob(os.path.join(directory, SHARD_PATTERN.replace("{:06d}", "[0-9]" * 6))))
+
+
+class TrajectoryWriter:
+    """Streams transitions into shards of shard_size rows in directory.
+
+    Shards already in the directory are kept and new ones are numbered after them.
+    """
+
+    def __init__(self, directory, shard_size=1_000_000):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.shard_size = shard_size
+        self._buffer = np.zeros(shard_size, dtype=TRANSITION_DTYPE)
+        self._filled = 0
+        self._next_shard = len(shard_paths(directory))
+        self.rows_written = 0
+
+    def add(self, obs, mask, action, reward, done):
+        """Adds a batch of transitions, e.g. one VecSedmiceEnv step."""
+        n = len(action)
+        start = 0
+        while start < n:
+            take = min(n - start, self.shard_size - self._filled)
+            rows = self._buffer[self._filled:self._filled + take]
+            end = start + take
+            rows["obs"] = obs[start:end]
+            rows["mask"] = mask[start:end]
+            rows["action"] = action[start:end]
+            rows["reward"] = reward[start:end]
+            rows["done"] = done[start:end]
+            self._filled += take
+            start = end
+            if self._filled == self.shard_size:
+                self.flush()
+
+    def flush(self):
+        """Saves the rows collected so far as a shard, a partial one if it is not full."""
+        if not self._filled:
+            return
+        path = os.path.join(self.directory, SHARD_PATTERN.format(self._next_shard))
+        np.save(path, self._buffer[:self._filled])
+        self._next_shard += 1
+        self.rows_written += self._filled
+        self._filled = 0
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_self_play(directory, num_steps, num_envs=256, policy=None, seed=None, shard_size=1_000_000):
+    """Plays num_steps steps of num_envs games and writes every transition.
+
+    policy(obs, mask) -> actions picks the moves, uniformly random legal ones by default.
+    """
+    env = VecSedmiceEnv(num_envs, seed=seed)
+    obs, mask = env.reset()
+    with TrajectoryWriter(directory, shard_size) as writer:
+        for _ in range(num_steps):
+            actions = env.sample_legal_actions(mask) if policy is None else policy(obs, mask)
+            next_obs, reward, done, next_mask = env.step(actions)
+            writer.add(obs, mask, actions, reward, done)
+            obs, mask = next_obs, next_mask
+    return writer.rows_written
+
+
+class TrajectoryDataset:
+    """Read-only view of the shards in a directory, nothing is loaded up front."""
+
+    def __init__(self, directory):
+        self.shards = [np.load(path, mmap_mode="r") for path in shard_paths(directory)]
+        for path, shard in zip(shard_paths(directory), self.shards):
+            if shard.dtype != TRANSITION_DTYPE:
+                raise ValueError(f"{path} has dtype {shard.dtype}, expected {TRANSITION_DTYPE}")
+        self.sizes = np.array([len(shard) for shard in self.shards], dtype=np.int64)
+
+    def __len__(self):
+        return int(self.sizes.sum())
+
+    def minibatches(self, batch_size, seed=None, shards_per_block=4, drop_last=True):
+        """Yields shuffled structured arrays of batch_size rows, one pass over the data.
+
+        Shards are visited in random order, shards_per_block at a time, and the
+        rows of a block are shuffled together; only the row indices of one block
+        are held in memory.
+        """
+        rng = np.random.default_rng(seed)
+        order = rng.permutation(len(self.shards))
+        for first in range(0, len(order), shards_per_block):
+            block = order[first:first + shards_per_block]
+            shard_of = np.repeat(np.arange(len(block)), self.sizes[block])
+            row_of = np.concatenate([np.arange(self.sizes[s]) for s in block])
+            perm = rng.permutation(len(row_of))
+            stop = len(perm) - len(perm) % batch_size if drop_last else len(perm)
+            for start in range(0, stop, batch_size):
+                pick = perm[start:start + batch_size]
+                yield self._gather(block, shard_of[pick], row_of[pick])
+
+    def sample(self, batch_size, rng=None):
+        """Uniform random rows from all shards, with replacement."""
+        rng = rng if rng is not None else np.random.default_rng()
+        index = rng.integers(0, len(self), size=batch_size)
+        shard = np.searchsorted(np.cumsum(self.sizes), index, side="right")
+        starts = np.concatenate(([0], np.cumsum(self.sizes)[:-1]))
+        return self._gather(np.arange(len(self.shards)), shard, index - starts[shard])
+
+    def _gather(self, block, shard_of, row_of):
+        batch = np.empty(len(row_of), dtype=TRANSITION_DTYPE)
+        for i, s in enumerate(block):
+            take = shard_of == i
+            if take.any():
+                batch[take] = self.shards[s][row_of[take]]
+        return batch
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write random self-play trajectories to shards.")
+    parser.add_argument("directory")
+    parser.add_argument("--steps", type=int, default=10_000)
+    parser.add_argument("--envs", type=int, default=256)
+    parser.add_argument("--shard-size", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    rows = write_self_play(args.directory, args.steps, args.envs, seed=args.seed, shard_size=args.shard_size)
+    print(f"{rows} transitions written to {args.directory}")
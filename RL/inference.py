@@ -0,0 +1,235 @@
+"""Batched model evaluation shared by many concurrent games.
+
+InferenceBroker gathers the observations that coroutines ask to have
+evaluated and runs them through the model in one call, once max_batch rows
+are waiting or max_delay_ms after the first of them arrived. Each caller
+gets its own rows of the outputs back.
+
+BrokeredNetwork puts a broker on an event loop in a background thread and
+looks like a PolicyValueNet to synchronous code, so bots playing in several
+threads share batches without knowing it:
+
+    with BrokeredNetwork(PolicyValueNet.load("weights.npz")) as network:
+        bots = [MonteCarloBot(network=network) for _ in range(16)]
+
+Self-play of concurrent games, reporting the batching achieved:
+
+    python -m RL.inference weights.npz --games 256 --max-batch 128
+"""
+import argparse
+import asyncio
+import random
+import threading
+import time
+import numpy as np
+from Helper.cardset import NUM_CARDS
+from Helper.engine import GameState
+from RL.policy_net import PolicyValueNet, encode_game_state, sample_actions
+
+# Why a batch was run
+FULL = "full"  # max_batch rows were waiting
+TIMEOUT = "timeout"  # The oldest request waited max_delay_ms
+FLUSH = "flush"  # Asked for with flush()
+
+
+class BrokerStats:
+    """Requests, batches and queue depth of an InferenceBroker.
+
+    Queue depth is the number of rows waiting, measured as every request arrives.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+        self.reasons = dict.fromkeys((FULL, TIMEOUT, FLUSH), 0)
+        self.max_batch_size = 0
+        self.total_depth = 0
+        self.max_queue_depth = 0
+        self.model_seconds = 0.0
+
+    def record_request(self, depth):
+        self.requests += 1
+        self.total_depth += depth
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+
+    def record_batch(self, rows, reason, seconds):
+        self.rows += rows
+        self.batches += 1
+        self.reasons[reason] += 1
+        self.max_batch_size = max(self.max_batch_size, rows)
+        self.model_seconds += seconds
+
+    def mean_batch_size(self):
+        return self.rows / self.batches if self.batches else 0.0
+
+    def mean_queue_depth(self):
+        return self.total_depth / self.requests if self.requests else 0.0
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "rows": self.rows,
+            "batches": self.batches,
+            "reasons": dict(self.reasons),
+            "mean_batch_size": self.mean_batch_size(),
+            "max_batch_size": self.max_batch_size,
+            "mean_queue_depth": self.mean_queue_depth(),
+            "max_queue_depth": self.max_queue_depth,
+            "model_seconds": self.model_seconds,
+        }
+
+    def __repr__(self):
+        return (f"BrokerStats(requests={self.requests}, batches={self.batches}, "
+                f"mean_batch_size={self.mean_batch_size():.1f}, max_queue_depth={self.max_queue_depth}, "
+                f"reasons={self.reasons})")
+
+
+class InferenceBroker:
+    """Runs the evaluate requests of concurrent coroutines through model in batches.
+
+    model(obs) takes a (n, features) float32 array and returns an array or a
+    tuple of arrays with n rows, e.g. PolicyValueNet.forward. It is called on
+    the event loop, use one broker per loop.
+    """
+
+    def __init__(self, model, max_batch=256, max_delay_ms=2.0):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self.stats = BrokerStats()
+        self._pending = []  # (rows, single, future)
+        self._rows = 0
+        self._timer = None
+
+    @property
+    def queue_depth(self):
+        """Rows waiting for the next batch."""
+        return self._rows
+
+    async def evaluate(self, obs):
+        """The model outputs for obs, one observation or a (n, features) array of them.
+
+        One observation gets rows without the batch axis.
+        """
+        obs = np.asarray(obs, dtype=np.float32)
+        single = obs.ndim == 1
+        rows = obs[None] if single else obs
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((rows, single, future))
+        self._rows += len(rows)
+        self.stats.record_request(self._rows)
+        if self._rows >= self.max_batch:
+            self._run(FULL)
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._run, TIMEOUT)
+        return await future
+
+    def flush(self):
+        """Runs whatever is waiting now, e.g. when no more requests will come."""
+        self._run(FLUSH)
+
+    def _run(self, reason):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending, self._rows = self._pending, [], 0
+        if not pending:
+            return
+        obs = np.concatenate([rows for rows, _, _ in pending])
+        start = time.perf_counter()
+        try:
+            outputs = self.model(obs)
+        except Exception as error:
+            for _, _, future in pending:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        self.stats.record_batch(len(obs), reason, time.perf_counter() - start)
+        several = isinstance(outputs, tuple)
+        if not several:
+            outputs = (outputs,)
+        first = 0
+        for rows, single, future in pending:
+            end = first + len(rows)
+            part = tuple(output[first] if single else output[first:end] for output in outputs)
+            first = end
+            # A caller that was cancelled no longer waits for its rows
+            if not future.done():
+                future.set_result(part if several else part[0])
+
+
+class BrokeredNetwork:
+    """PolicyValueNet look-alike whose forward calls from any thread are batched by an InferenceBroker.
+
+    The broker runs on its own event loop in a daemon thread. forward blocks
+    the calling thread until its batch has run, so it must not be called from
+    that loop, and the object cannot be sent to worker processes
+    (MonteCarloBot needs workers=1).
+    """
+
+    def __init__(self, network, max_batch=256, max_delay_ms=2.0):
+        self.network = network
+        self.broker = InferenceBroker(network.forward, max_batch, max_delay_ms)
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="inference-broker", daemon=True)
+        self._thread.start()
+
+    @property
+    def stats(self):
+        return self.broker.stats
+
+    def forward(self, obs):
+        return asyncio.run_coroutine_threadsafe(self.broker.evaluate(obs), self.loop).result()
+
+    def choose_cards(self, obs, legal_masks, temperature=1.0, rng=None):
+        """As PolicyValueNet.choose_cards."""
+        logits, _ = self.forward(obs)
+        return sample_actions(logits[:, :NUM_CARDS], legal_masks, temperature, rng)
+
+    def close(self):
+        if self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+async def play_game(broker, seed=None, temperature=1.0):
+    """Plays a whole game with both players sampling moves from the broker's policy. Returns the final GameState."""
+    state = GameState(rng=random.Random(seed))
+    rng = np.random.default_rng(seed)
+    while state.winner is None:
+        logits, _ = await broker.evaluate(encode_game_state(state))
+        state.step(int(sample_actions(logits[None], [state.legal_mask()], temperature, rng)[0]))
+    return state
+
+
+async def play_games(broker, num_games, seed=None, temperature=1.0):
+    """Plays num_games games concurrently, all evaluated through broker."""
+    seeds = np.random.SeedSequence(seed).generate_state(num_games)
+    return await asyncio.gather(*(play_game(broker, int(s), temperature) for s in seeds))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Self-play concurrent games through one inference broker.")
+    parser.add_argument("weights", help="PolicyValueNet .npz weights")
+    parser.add_argument("--games", type=int, default=256)
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-delay-ms", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    broker = InferenceBroker(PolicyValueNet.load(args.weights).forward, args.max_batch, args.max_delay_ms)
+    start = time.perf_counter()
+    states = asyncio.run(play_games(broker, args.games, args.seed))
+    seconds = time.perf_counter() - start
+    wins = sum(state.winner == 0 for state in states)
+    print(f"{args.games} games in {seconds:.2f} s, player 1 won {wins}")
+    print(f"{broker.stats.rows / seconds:,.0f} evaluations/s, {broker.stats}")
@@ -0,0 +1,243 @@
+"""Small NumPy policy/value network used inside Monte Carlo rollouts.
+
+The network reads the VecSedmiceEnv observation layout, so one trained on
+self-play trajectories (see RL.dataset) can drive bot simulations. Hidden
+layers use ReLU. The policy head gives a logit for every action and the value
+head gives the points of the current hand for the player to move.
+
+Weights are stored as a .npz file with the arrays hidden_w0, hidden_b0, ...,
+policy_w, policy_b, value_w and value_b. To write freshly initialised ones:
+
+    python -m RL.policy_net weights.npz --hidden 128 128 --seed 0
+"""
+import argparse
+import random
+import time
+import numpy as np
+from Helper.cardset import NUM_CARDS, NUM_ACTIONS, NO_CARD, FULL_DECK
+from Helper.engine import WINNING_POINTS
+from Bots.search_state import SearchState, BOT, OPPONENT
+from Bots.rollout import RolloutStats, end_of_hand, TRUNCATED
+from Bots.monte_carlo_bot import deal_opponent
+from RL.vec_env import OBS_SIZE, OBS_HAND, OBS_MIDDLE, OBS_LEAD, OBS_PLAYED
+
+_BITS = np.arange(NUM_ACTIONS, dtype=np.uint64)
+
+
+def mask_bits(masks, width=NUM_CARDS):
+    """(n, width) float32 array of the low bits of n card sets or legal action masks."""
+    return (np.asarray(masks, dtype=np.uint64)[:, None] >> _BITS[:width] & 1).astype(np.float32)
+
+
+def sample_actions(logits, legal_masks, temperature=1.0, rng=None):
+    """A column per row of logits: sampled from the softmax over the legal ones, or the best one at temperature 0."""
+    if temperature:
+        rng = rng if rng is not None else np.random.default_rng()
+        # Gumbel-max: the argmax of logits plus Gumbel noise is a softmax sample
+        logits = logits / temperature - np.log(-np.log(rng.random(logits.shape)))
+    return np.where(mask_bits(legal_masks, logits.shape[1]) > 0, logits, -np.inf).argmax(axis=1)
+
+
+def encode_states(states, played=0, deck_left=0):
+    """Observations of SearchStates for the player to move, in the VecSedmiceEnv layout.
+
+    A SearchState knows nothing about earlier hands, so played (the card set
+    gone in earlier hands of the deck) and deck_left are given by the caller
+    and the points features are left at 0.
+    """
+    obs = np.zeros((len(states), OBS_SIZE), dtype=np.float32)
+    obs[:, OBS_HAND] = mask_bits([state.hands[state.turn] for state in states])
+    obs[:, OBS_MIDDLE] = mask_bits([state.middle for state in states])
+    leads = np.array([state.lead for state in states], dtype=np.intp)
+    has_lead = leads != NO_CARD
+    obs[np.flatnonzero(has_lead), OBS_LEAD.start + leads[has_lead]] = 1
+    obs[:, OBS_PLAYED] = mask_bits([played])
+    obs[:, 128] = [state.has_initiative() for state in states]
+    obs[:, 129] = deck_left / NUM_CARDS
+    return obs
+
+
+def encode_game_state(state):
+    """Observation of a Helper.engine.GameState for the player to move, as VecSedmiceEnv.observation makes it."""
+    me = state.current
+    deck = sum(1 << card.id for card in state.deck.cards)
+    obs = np.zeros(OBS_SIZE, dtype=np.float32)
+    obs[OBS_HAND] = mask_bits([state.hands[me]])[0]
+    obs[OBS_MIDDLE] = mask_bits([state.middle])[0]
+    if state.lead != NO_CARD:
+        obs[OBS_LEAD.start + state.lead] = 1
+    obs[OBS_PLAYED] = mask_bits([FULL_DECK & ~(state.hands[0] | state.hands[1] | state.middle | deck)])[0]
+    obs[128] = me == state.initiative
+    obs[129] = len(state.deck.cards) / NUM_CARDS
+    obs[130] = state.points[me] / WINNING_POINTS
+    obs[131] = state.points[1 - me] / WINNING_POINTS
+    return obs
+
+
+class PolicyValueNet:
+    """MLP from OBS_SIZE features to NUM_ACTIONS policy logits and a value."""
+
+    def __init__(self, hidden_weights, hidden_biases, policy_w, policy_b, value_w, value_b):
+        self.hidden = [(np.asarray(w, dtype=np.float32), np.asarray(b, dtype=np.float32))
+                       for w, b in zip(hidden_weights, hidden_biases)]
+        self.policy_w = np.asarray(policy_w, dtype=np.float32)
+        self.policy_b = np.asarray(policy_b, dtype=np.float32)
+        self.value_w = np.asarray(value_w, dtype=np.float32).reshape(-1)
+        self.value_b = np.float32(np.asarray(value_b).reshape(()))
+        width = OBS_SIZE
+        for w, b in self.hidden:
+            if w.shape != (width, len(b)):
+                raise ValueError(f"Hidden layer of shape {w.shape} does not follow a layer of width {width}")
+            width = len(b)
+        if self.policy_w.shape != (width, NUM_ACTIONS) or self.policy_b.shape != (NUM_ACTIONS,):
+            raise ValueError(f"Policy head of shape {self.policy_w.shape}, expected {(width, NUM_ACTIONS)}")
+        if self.value_w.shape != (width,):
+            raise ValueError(f"Value head of shape {self.value_w.shape}, expected {(width,)}")
+
+    @classmethod
+    def initialize(cls, hidden_sizes=(128,), seed=None):
+        """A network with He initialised weights and zero biases."""
+        rng = np.random.default_rng(seed)
+        sizes = [OBS_SIZE, *hidden_sizes]
+        weights = [rng.normal(0, np.sqrt(2 / n_in), (n_in, n_out)) for n_in, n_out in zip(sizes, sizes[1:])]
+        biases = [np.zeros(n) for n in hidden_sizes]
+        width = sizes[-1]
+        return cls(weights, biases, rng.normal(0, np.sqrt(1 / width), (width, NUM_ACTIONS)), np.zeros(NUM_ACTIONS),
+                   rng.normal(0, np.sqrt(1 / width), width), 0.0)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            layers = sum(1 for name in data.files if name.startswith("hidden_w"))
+            return cls([data[f"hidden_w{i}"] for i in range(layers)], [data[f"hidden_b{i}"] for i in range(layers)],
+                       data["policy_w"], data["policy_b"], data["value_w"], data["value_b"])
+
+    def save(self, path):
+        arrays = {}
+        for i, (w, b) in enumerate(self.hidden):
+            arrays[f"hidden_w{i}"] = w
+            arrays[f"hidden_b{i}"] = b
+        np.savez(path, policy_w=self.policy_w, policy_b=self.policy_b, value_w=self.value_w,
+                 value_b=self.value_b, **arrays)
+
+    def forward(self, obs):
+        """(policy logits (n, NUM_ACTIONS), values (n,)) for a batch of observations."""
+        h = np.asarray(obs, dtype=np.float32)
+        for w, b in self.hidden:
+            h = np.maximum(h @ w + b, 0)
+        return h @ self.policy_w + self.policy_b, h @ self.value_w + self.value_b
+
+    def choose_cards(self, obs, legal_masks, temperature=1.0, rng=None):
+        """A card id for every row: sampled from the softmax over its legal cards, or the best one at temperature 0.
+
+        Passing is never chosen, rollouts do not pass.
+        """
+        logits, _ = self.forward(obs)
+        return sample_actions(logits[:, :NUM_CARDS], legal_masks, temperature, rng)
+
+
+class NetworkPolicy:
+    """Rollout policy (state, legal_mask) -> card id backed by a PolicyValueNet.
+
+    It scores one state per call, which fits rollout and ISMCTSBot;
+    run_network_simulations scores whole batches at once.
+    """
+
+    def __init__(self, network, temperature=1.0, seed=None):
+        self.network = network
+        self.temperature = temperature
+        self.rng = np.random.default_rng(seed)
+
+    def __call__(self, state, legal_mask):
+        return int(self.network.choose_cards(encode_states([state]), [legal_mask], self.temperature, self.rng)[0])
+
+
+def run_network_simulations(state, unseen_ids, opponent_hand_size, moves, num_simulations, network, rng=random,
+                            deadline=None, timed=False, leaf_depth=None, batch_size=256, temperature=1.0):
+    """run_simulations with the rollouts of many simulations stepped together through network.
+
+    Up to batch_size simulations (whole rounds of one per move) are dealt at
+    once and played in lockstep, every ply choosing the cards of all of them
+    with one forward pass. With leaf_depth a rollout still going after that
+    many plies is cut short and scored with the value head.
+    Returns the score sums and sums of squares per move, the number of rounds
+    and the RolloutStats, like run_simulations. Deals come from rng and the
+    policy samples from a NumPy generator seeded from it.
+    """
+    sampler = np.random.default_rng(rng.getrandbits(64))
+    stats = RolloutStats()
+    sums = [0.0] * len(moves)
+    squares = [0.0] * len(moves)
+    rounds = 0
+    # Cards neither in the bot's hand, the pile nor unseen went in earlier hands of this deck
+    played = FULL_DECK & ~(state.hands[BOT] | state.middle | sum(1 << cid for cid in unseen_ids))
+    deck_left = len(unseen_ids) - opponent_hand_size
+    per_batch = max(1, batch_size // len(moves)) if moves else 0
+    while moves and (num_simulations is None or rounds < num_simulations):
+        batch_rounds = per_batch if num_simulations is None else min(per_batch, num_simulations - rounds)
+        if timed:
+            start = time.perf_counter()
+        states = []
+        for _ in range(batch_rounds):
+            for cid in moves:
+                state.apply(cid)
+                deal_opponent(state, unseen_ids, opponent_hand_size, rng)
+                states.append(SearchState(state.hands[BOT], state.hands[OPPONENT], state.middle, state.lead,
+                                          state.last, state.middle_len, state.bot_initiative))
+                state.undo(cid)
+        if timed:
+            dealt = time.perf_counter()
+            stats.determinize_seconds += dealt - start
+        scores = _play_out(states, network, played, deck_left, leaf_depth, temperature, sampler, stats)
+        for k, score in enumerate(scores):
+            i = k % len(moves)
+            sums[i] += score
+            squares[i] += score * score
+        if timed:
+            stats.rollout_seconds += time.perf_counter() - dealt
+        rounds += batch_rounds
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+    return sums, squares, rounds, stats
+
+
+def _play_out(states, network, played, deck_left, leaf_depth, temperature, rng, stats):
+    """Plays every state to the end of its hand together and returns the scores for the bot."""
+    scores = [0.0] * len(states)
+    active = list(range(len(states)))
+    depth = 0
+    while active:
+        moving = []
+        for i in active:
+            end = end_of_hand(states[i])
+            if end is None:
+                moving.append(i)
+            else:
+                reason, scores[i] = end
+                stats.record(depth, reason)
+        if moving and leaf_depth is not None and depth >= leaf_depth:
+            _, values = network.forward(encode_states([states[i] for i in moving], played, deck_left))
+            for i, value in zip(moving, values.tolist()):
+                # The value is seen from the player to move
+                scores[i] = value if states[i].turn == BOT else -value
+                stats.record(depth, TRUNCATED)
+            break
+        if moving:
+            batch = [states[i] for i in moving]
+            cards = network.choose_cards(encode_states(batch, played, deck_left),
+                                         [s.legal_mask() for s in batch], temperature, rng)
+            for s, card in zip(batch, cards.tolist()):
+                s.apply(card)
+        active = moving
+        depth += 1
+    return scores
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write freshly initialised policy/value network weights.")
+    parser.add_argument("path")
+    parser.add_argument("--hidden", type=int, nargs="+", default=[128])
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    PolicyValueNet.initialize(args.hidden, args.seed).save(args.path)
+    print(f"Network with hidden layers {args.hidden} written to {args.path}")
@@ -0,0 +1,271 @@
+"""Fixed-capacity experience replay kept in preallocated NumPy arrays.
+
+Transitions are rows of RL.dataset.TRANSITION_DTYPE in one ring buffer that
+overwrites the oldest rows once full. A buffer made with shared=True lives in
+a multiprocessing SharedMemory block, so self-play worker processes can add
+to the buffer the trainer samples from:
+
+    buffer = ReplayBuffer(1_000_000, shared=True)
+    workers = [multiprocessing.Process(target=play, args=(buffer,)) for _ in range(4)]
+
+Passing the buffer to a process attaches it to the same memory; only the
+process that created it unlinks the block on close. Samples may include rows
+a worker is writing at that moment.
+"""
+import contextlib
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+import numpy as np
+from RL.dataset import TRANSITION_DTYPE
+
+_HEADER_DTYPE = np.dtype([("next", np.int64), ("size", np.int64), ("max_priority", np.float64)])
+
+
+class ReplayBuffer:
+    """Ring buffer of capacity transitions with uniform sampling.
+
+    obs, mask, action, reward and done are views of the whole storage, in slot
+    order. Adding costs O(1) per transition and sampling is vectorized.
+    """
+
+    def __init__(self, capacity, shared=False, _attach=None):
+        self.capacity = capacity
+        self._shm = None
+        self._owner = None  # Pid of the process that created the shared block
+        self.lock = contextlib.nullcontext()
+        nbytes = self._nbytes()
+        if _attach is not None:
+            name, self.lock = _attach
+            self._shm = shared_memory.SharedMemory(name=name)
+            buffer = self._shm.buf
+        elif shared:
+            self._shm = shared_memory.SharedMemory(create=True, size=nbytes)
+            self._owner = os.getpid()
+            self.lock = multiprocessing.Lock()
+            buffer = self._shm.buf
+        else:
+            buffer = bytearray(nbytes)
+        self._map(buffer)
+        if _attach is None:
+            self._header[0] = (0, 0, 1.0)
+            self._init_storage()
+
+    def _nbytes(self):
+        return _HEADER_DTYPE.itemsize + self.capacity * TRANSITION_DTYPE.itemsize
+
+    def _map(self, buffer):
+        self._header = np.ndarray(1, dtype=_HEADER_DTYPE, buffer=buffer)
+        self.data = np.ndarray(self.capacity, dtype=TRANSITION_DTYPE, buffer=buffer, offset=_HEADER_DTYPE.itemsize)
+        self.obs = self.data["obs"]
+        self.mask = self.data["mask"]
+        self.action = self.data["action"]
+        self.reward = self.data["reward"]
+        self.done = self.data["done"]
+
+    def _init_storage(self):
+        self.data[...] = np.zeros((), dtype=TRANSITION_DTYPE)
+
+    @property
+    def name(self):
+        """Name of the shared memory block, None for a private buffer."""
+        return self._shm.name if self._shm is not None else None
+
+    def __len__(self):
+        return int(self._header["size"][0])
+
+    def __reduce__(self):
+        if self._shm is None:
+            raise TypeError("Only a buffer made with shared=True can be passed to another process")
+        return _attach, (type(self), self._attach_args())
+
+    def _attach_args(self):
+        return {"capacity": self.capacity, "_attach": (self.name, self.lock)}
+
+    def _reserve(self, n):
+        """Slots for n new transitions, the oldest ones once the buffer is full."""
+        with self.lock:
+            header = self._header[0]
+            start = int(header["next"])
+            header["next"] = (start + n) % self.capacity
+            header["size"] = min(int(header["size"]) + n, self.capacity)
+        return (start + np.arange(n)) % self.capacity
+
+    def add(self, obs, mask, action, reward, done):
+        """Adds a batch of transitions, e.g. one VecSedmiceEnv step. Returns the slots written.
+
+        Of a batch longer than the capacity only the last capacity rows are kept.
+        """
+        n = min(len(action), self.capacity)
+        first = len(action) - n
+        slots = self._reserve(n)
+        self.obs[slots] = obs[first:]
+        self.mask[slots] = mask[first:]
+        self.action[slots] = action[first:]
+        self.reward[slots] = reward[first:]
+        self.done[slots] = done[first:]
+        return slots
+
+    def sample_slots(self, batch_size, rng=None):
+        rng = rng if rng is not None else np.random.default_rng()
+        size = len(self)
+        if not size:
+            raise ValueError("Cannot sample from an empty replay buffer")
+        return rng.integers(0, size, size=batch_size)
+
+    def gather(self, slots, out=None):
+        """The transitions in slots, copied into out (a TRANSITION_DTYPE array) if given.
+
+        Reusing out across training steps avoids allocating a batch every time.
+        """
+        return np.take(self.data, slots, out=out[:len(slots)] if out is not None else None)
+
+    def sample(self, batch_size, rng=None, out=None):
+        """Uniform random transitions, with replacement. Returns (slots, batch)."""
+        slots = self.sample_slots(batch_size, rng)
+        return slots, self.gather(slots, out)
+
+    def latest(self, n):
+        """View (no copy) of the last n transitions added, when they are contiguous in the ring.
+
+        Returns None if they wrap around the end of the storage.
+        """
+        end = int(self._header["next"][0]) or (self.capacity if len(self) else 0)
+        if n > len(self) or n > end:
+            return None
+        return self.data[end - n:end]
+
+    def close(self):
+        """Releases the shared memory, unlinking it in the process that created it."""
+        if self._shm is None:
+            return
+        # The views must go before the block can be closed
+        self._header = self.data = self.obs = self.mask = self.action = self.reward = self.done = None
+        self._release()
+        self._shm.close()
+        if self._owner == os.getpid():
+            self._shm.unlink()
+        self._shm = None
+
+    def _release(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _attach(cls, kwargs):
+    return cls(**kwargs)
+
+
+class SumTree:
+    """Binary tree of sums over capacity leaf values, stored in a flat array.
+
+    Leaf i is tree[leaves + i] and node k holds tree[2k] + tree[2k + 1], so
+    tree[1] is the total. Updates and prefix-sum searches take a batch of
+    indices at once and cost O(log capacity) NumPy operations.
+    """
+
+    def __init__(self, capacity, tree=None):
+        self.leaves = 1 << max(capacity - 1, 0).bit_length()
+        self.depth = self.leaves.bit_length() - 1
+        self.tree = tree if tree is not None else np.zeros(2 * self.leaves)
+
+    @staticmethod
+    def nbytes(capacity):
+        return 2 * (1 << max(capacity - 1, 0).bit_length()) * np.dtype(np.float64).itemsize
+
+    def total(self):
+        return float(self.tree[1])
+
+    def get(self, indices):
+        return self.tree[self.leaves + np.asarray(indices)]
+
+    def update(self, indices, values):
+        nodes = self.leaves + np.asarray(indices)
+        self.tree[nodes] = values
+        while self.depth:
+            nodes = np.unique(nodes // 2)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+            if nodes[0] == 1:
+                break
+
+    def find(self, prefix_sums):
+        """Leaf index for each value in [0, total): the first leaf whose running sum exceeds it."""
+        values = np.array(prefix_sums, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        for _ in range(self.depth):
+            left = 2 * nodes
+            left_sum = self.tree[left]
+            right = values >= left_sum
+            values = np.where(right, values - left_sum, values)
+            nodes = np.where(right, left + 1, left)
+        return nodes - self.leaves
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """ReplayBuffer sampling transitions in proportion to priority ** alpha.
+
+    New transitions get the highest priority seen so far. After a training
+    step, update_priorities sets the priorities (e.g. TD errors) of the
+    sampled slots. The sum tree is in the shared block as well.
+    """
+
+    def __init__(self, capacity, alpha=0.6, epsilon=1e-6, shared=False, _attach=None):
+        self.alpha = alpha
+        self.epsilon = epsilon
+        super().__init__(capacity, shared, _attach)
+
+    def _nbytes(self):
+        return super()._nbytes() + SumTree.nbytes(self.capacity)
+
+    def _map(self, buffer):
+        super()._map(buffer)
+        offset = super()._nbytes()
+        tree = np.ndarray(SumTree.nbytes(self.capacity) // 8, dtype=np.float64, buffer=buffer, offset=offset)
+        self.priorities = SumTree(self.capacity, tree)
+
+    def _init_storage(self):
+        super()._init_storage()
+        self.priorities.tree[:] = 0
+
+    def _attach_args(self):
+        return {**super()._attach_args(), "alpha": self.alpha, "epsilon": self.epsilon}
+
+    def _release(self):
+        self.priorities = None
+
+    def add(self, obs, mask, action, reward, done):
+        slots = super().add(obs, mask, action, reward, done)
+        with self.lock:
+            self.priorities.update(slots, self._header["max_priority"][0] ** self.alpha)
+        return slots
+
+    def sample_slots(self, batch_size, rng=None):
+        """Slots drawn one from each of batch_size equal slices of the total priority."""
+        rng = rng if rng is not None else np.random.default_rng()
+        total = self.priorities.total()
+        if not len(self) or total <= 0:
+            raise ValueError("Cannot sample from an empty replay buffer")
+        points = (np.arange(batch_size) + rng.random(batch_size)) * (total / batch_size)
+        return np.minimum(self.priorities.find(points), len(self) - 1)
+
+    def sample(self, batch_size, rng=None, out=None, *, beta=0.4):
+        """Prioritized transitions. Returns (slots, batch, importance weights).
+
+        The weights (len(self) * P(slot)) ** -beta are scaled so the largest is 1.
+        """
+        slots = self.sample_slots(batch_size, rng)
+        probabilities = self.priorities.get(slots) / self.priorities.total()
+        weights = (len(self) * probabilities) ** -beta
+        return slots, self.gather(slots, out), (weights / weights.max()).astype(np.float32)
+
+    def update_priorities(self, slots, priorities):
+        priorities = np.abs(np.asarray(priorities, dtype=np.float64)) + self.epsilon
+        with self.lock:
+            header = self._header[0]
+            header["max_priority"] = max(float(header["max_priority"]), float(priorities.max()))
+            self.priorities.update(slots, priorities ** self.alpha)
@@ -0,0 +1,197 @@
+import numpy as np
+from Helper.cardset import (NUM_CARDS, NUM_RANKS, NUM_ACTIONS, NO_CARD, SCORE_MASK, CARD_POINTS, KILL_MASKS,
+                            LEGAL_MASKS, PASS)
+from Helper.engine import WINNING_POINTS, HAND_SIZE
+
+# Card ids are the Helper.cardset ids: id = suit * 8 + rank, in Deck.__init__ order
+PASS_ACTION = PASS
+
+CARD_RANK = np.arange(NUM_CARDS, dtype=np.int8) % NUM_RANKS
+CARD_SCORE = np.array([CARD_POINTS * (SCORE_MASK >> i & 1) for i in range(NUM_CARDS)], dtype=np.int32)
+# KILLS[lead_rank, card] is True if the card may answer a pile led with lead_rank
+KILLS = np.array([[KILL_MASKS[rank] >> card & 1 for card in range(NUM_CARDS)] for rank in range(NUM_RANKS)],
+                 dtype=bool)
+# Helper.cardset.LEGAL_MASKS as arrays: LEGAL_TABLE[is_initiative, lead card or NO_CARD, action]
+LEGAL_TABLE = np.array([[[mask >> action & 1 for action in range(NUM_ACTIONS)] for mask in row]
+                        for row in LEGAL_MASKS], dtype=bool)
+
+# Observation layout, all from the point of view of the player to move
+OBS_HAND = slice(0, 32)
+OBS_MIDDLE = slice(32, 64)
+OBS_LEAD = slice(64, 96)
+OBS_PLAYED = slice(96, 128)
+OBS_SIZE = 132
+
+
+class VecSedmiceEnv:
+    """N Sedmice games kept in NumPy arrays and stepped together.
+
+    Follows the rules of run_game / GameState. Actions are card ids, or
+    PASS_ACTION for the initiative player giving up the middle pile. Rewards are
+    the points of a finished hand seen from the player that acted. Finished
+    games are reset automatically, the returned observation is the new game's.
+    """
+
+    def __init__(self, num_envs, cut=0, seed=None):
+        self.num_envs = num_envs
+        self.cut = cut
+        self.rng = np.random.default_rng(seed)
+        n = num_envs
+        self._rows = np.arange(n)
+        self.hands = np.zeros((n, 2, NUM_CARDS), dtype=bool)
+        self.played = np.zeros((n, NUM_CARDS), dtype=bool)  # Cards gone from earlier hands of this deck
+        self.deck = np.zeros((n, NUM_CARDS), dtype=np.int8)
+        self.deck_left = np.zeros(n, dtype=np.int32)  # Cards are drawn from deck[deck_left - 1]
+        self.middle = np.zeros((n, 2 * HAND_SIZE), dtype=np.int8)
+        self.middle_len = np.zeros(n, dtype=np.int32)
+        self.middle_score = np.zeros(n, dtype=np.int32)
+        self.lead_rank = np.zeros(n, dtype=np.int8)
+        self.points = np.zeros((n, 2), dtype=np.int32)
+        self.round_points = np.zeros((n, 2), dtype=np.int32)
+        self.initiative = np.zeros(n, dtype=np.int8)
+        self.current = np.zeros(n, dtype=np.int8)
+
+    def reset(self):
+        """Starts all games over. Returns (observation, legal action mask)."""
+        self._reset_games(self._rows)
+        return self.observation(), self.legal_action_mask()
+
+    def _reset_games(self, idx):
+        self.points[idx] = 0
+        self.round_points[idx] = 0
+        initiative = self.rng.integers(0, 2, size=len(idx), dtype=np.int8)
+        self.initiative[idx] = initiative
+        self.current[idx] = initiative
+        self._new_deck(idx, self.cut)
+
+    def _new_deck(self, idx, cut=0):
+        """Shuffles a fresh deck for the given games and deals, Player 1 first."""
+        order = self.rng.permuted(np.tile(np.arange(NUM_CARDS, dtype=np.int8), (len(idx), 1)), axis=1)
+        if cut:
+            # Deck.cut_deck: cards[number:] + cards[:number]
+            order = np.roll(order, -cut, axis=1)
+        self.deck[idx] = order
+        self.deck_left[idx] = NUM_CARDS
+        self.hands[idx] = False
+        self.played[idx] = False
+        self.middle_len[idx] = 0
+        self.middle_score[idx] = 0
+        for player in (0, 1):
+            self._draw(idx, np.full(len(idx), player), np.full(len(idx), HAND_SIZE))
+
+    def _draw(self, idx, player, num):
+        """Game idx[i] moves num[i] cards from the top of its deck into player[i]'s hand."""
+        for k in range(num.max(initial=0)):
+            take = k < num
+            g, p = idx[take], player[take]
+            top = self.deck_left[g] - 1
+            self.hands[g, p, self.deck[g, top]] = True
+            self.deck_left[g] = top
+
+    def legal_action_mask(self):
+        """Returns a (num_envs, NUM_ACTIONS) bool mask of legal actions."""
+        lead = np.where(self.middle_len > 0, self.middle[:, 0], NO_CARD)
+        role = (self.current == self.initiative).astype(np.intp)
+        mask = LEGAL_TABLE[role, lead]
+        mask[:, :NUM_CARDS] &= self.hands[self._rows, self.current]
+        return mask
+
+    def observation(self):
+        """Returns the (num_envs, OBS_SIZE) float32 observation of the player to move."""
+        rows = self._rows
+        obs = np.zeros((self.num_envs, OBS_SIZE), dtype=np.float32)
+        obs[:, OBS_HAND] = self.hands[rows, self.current]
+        has_middle = self.middle_len > 0
+        for k in range(self.middle.shape[1]):
+            on_pile = self.middle_len > k
+            obs[rows[on_pile], OBS_MIDDLE.start + self.middle[on_pile, k]] = 1
+        obs[rows[has_middle], OBS_LEAD.start + self.middle[has_middle, 0]] = 1
+        obs[:, OBS_PLAYED] = self.played
+        me = self.current.astype(np.intp)
+        obs[:, 128] = self.current == self.initiative
+        obs[:, 129] = self.deck_left / NUM_CARDS
+        obs[:, 130] = self.points[rows, me] / WINNING_POINTS
+        obs[:, 131] = self.points[rows, 1 - me] / WINNING_POINTS
+        return obs
+
+    def step(self, actions):
+        """Advances every game by one action.
+
+        Returns (observation, reward, done, legal action mask).
+        """
+        actions = np.asarray(actions, dtype=np.intp)
+        rows = self._rows
+        if not self.legal_action_mask()[rows, actions].all():
+            raise ValueError("Illegal action passed to VecSedmiceEnv.step")
+        actor = self.current.astype(np.intp)
+        is_pass = actions == PASS_ACTION
+        reward = np.zeros(self.num_envs, dtype=np.float32)
+
+        # Play the cards
+        play = rows[~is_pass]
+        card = actions[play]
+        self.hands[play, actor[play], card] = False
+        opening = self.middle_len[play] == 0
+        self.lead_rank[play[opening]] = CARD_RANK[card[opening]]
+        self.middle[play, self.middle_len[play]] = card
+        self.middle_len[play] += 1
+        self.middle_score[play] += CARD_SCORE[card]
+        by_initiative = actor[play] == self.initiative[play]
+        killed = KILLS[self.lead_rank[play], card]
+
+        # A non-initiative card that does not kill gives the pile to the initiative,
+        # a pass gives it to the other player
+        ended = np.zeros(self.num_envs, dtype=bool)
+        ended[is_pass] = True
+        ended[play[~by_initiative & ~killed]] = True
+        taker = np.where(is_pass, 1 - self.initiative, self.initiative).astype(np.intp)
+        self.current[play] = np.where(by_initiative, 1 - actor[play], self.initiative[play])
+
+        done = np.zeros(self.num_envs, dtype=bool)
+        end = rows[ended]
+        if len(end):
+            winner = taker[end]
+            score = self.middle_score[end]
+            reward[end] = np.where(winner == actor[end], score, -score)
+            self.points[end, winner] += score
+            self.round_points[end, winner] += score
+            done[end] = self.points[end, winner] >= WINNING_POINTS
+            self._end_hands(end[~done[end]], winner[~done[end]])
+
+        finished = rows[done]
+        if len(finished):
+            self._reset_games(finished)
+        return self.observation(), reward, done, self.legal_action_mask()
+
+    def _end_hands(self, idx, taker):
+        """Refills the hands after a hand and gives the initiative to the taker."""
+        for k in range(self.middle.shape[1]):
+            on_pile = self.middle_len[idx] > k
+            self.played[idx[on_pile], self.middle[idx[on_pile], k]] = True
+        left = self.deck_left[idx]
+        pile = self.middle_len[idx]
+        num = np.where(pile > left, left // 2, pile // 2)
+        self._draw(idx, taker, num)
+        self._draw(idx, 1 - taker, num)
+        self.middle_len[idx] = 0
+        self.middle_score[idx] = 0
+        self.initiative[idx] = taker
+        self.current[idx] = taker
+
+        # Both hands empty: new deck, the better scorer of the round leads
+        empty = ~self.hands[idx].any(axis=(1, 2))
+        new_round = idx[empty]
+        if len(new_round):
+            rp = self.round_points[new_round]
+            self.initiative[new_round] = np.where(
+                rp[:, 0] > rp[:, 1], 0, np.where(rp[:, 1] > rp[:, 0], 1, self.initiative[new_round]))
+            self.current[new_round] = self.initiative[new_round]
+            self.round_points[new_round] = 0
+            self._new_deck(new_round)
+
+    def sample_legal_actions(self, mask=None):
+        """Picks a uniformly random legal action in every game."""
+        if mask is None:
+            mask = self.legal_action_mask()
+        weights = self.rng.random(mask.shape) * mask
+        return weights.argmax(axis=1)
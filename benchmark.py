@@ -0,0 +1,194 @@
+"""Speed benchmarks of the game objects, the bot and whole games.
+
+    python -m benchmark --out bench.json
+    python -m benchmark --baseline benchmark_baseline.json --threshold 0.2
+    python -m benchmark --quick --save-baseline benchmark_baseline.json
+
+Every benchmark reports a rate (operations per second, higher is better).
+With --baseline the rates are compared to a stored run and the exit code is 1
+if any benchmark got slower by more than the threshold fraction. Baselines
+are only comparable on the machine they were recorded on.
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from Helper.card import CARDS
+from Helper.deck import Deck
+from Helper.player import Player
+from Helper.cardset import NO_CARD, to_cards
+from Helper.engine import play_random_game
+from Bots.search_state import SearchState
+from Bots.monte_carlo_bot import MonteCarloBot
+
+CHOOSE_MOVE_SIMULATIONS = (10, 100, 500)
+
+
+def bench_deck_construct(n):
+    for _ in range(n):
+        Deck()
+    return n
+
+
+def bench_shuffle_cut(n):
+    deck = Deck()
+    for i in range(n):
+        deck.shuffle_deck()
+        deck.cut_deck(i % 32)
+    return n
+
+
+def bench_player_draw(n):
+    """Deals whole decks four cards at a time, counts cards drawn."""
+    player = Player("bench")
+    deck = Deck()
+    drawn = 0
+    while drawn < n:
+        deck.cards = list(CARDS)
+        player.hand = []
+        for _ in range(8):
+            player.draw(deck, 4)
+        drawn += 32
+    return drawn
+
+
+def bench_get_score(n):
+    cards = CARDS * (n // len(CARDS) + 1)
+    for card in cards[:n]:
+        card.get_score()
+    return n
+
+
+def _random_position(rng):
+    """Four cards for each player with the bot to lead."""
+    ids = rng.sample(range(32), 8)
+    hand = sum(1 << i for i in ids[:4])
+    opp = sum(1 << i for i in ids[4:])
+    return SearchState(hand, opp, 0, NO_CARD, NO_CARD, 0, True)
+
+
+def bench_rollouts(n):
+    """MonteCarloBot._play_hand from random four card positions, counts rollouts."""
+    bot = MonteCarloBot()
+    rng = random.Random(1)
+    states = [_random_position(rng) for _ in range(64)]
+    for i in range(n):
+        bot._play_hand(states[i % 64])
+    return n
+
+
+def make_bench_choose_move(num_simulations):
+    def bench(n):
+        bot = MonteCarloBot(num_simulations=num_simulations, seed=0, use_endgame_solver=False)
+        rng = random.Random(2)
+        for _ in range(n):
+            ids = rng.sample(range(32), 20)
+            hand = to_cards(sum(1 << i for i in ids[:4]))
+            unseen = to_cards(sum(1 << i for i in ids[4:]))
+            bot.choose_move(hand, None, unseen, 4, True)
+        return n
+    return bench
+
+
+def bench_full_game(n):
+    """Random full games to 510 points through the engine."""
+    for _ in range(n):
+        play_random_game()
+    return n
+
+
+BENCHMARKS = {
+    "deck_construct": bench_deck_construct,
+    "shuffle_cut": bench_shuffle_cut,
+    "player_draw": bench_player_draw,
+    "card_get_score": bench_get_score,
+    "play_hand_rollouts": bench_rollouts,
+    **{f"choose_move_{sims}": make_bench_choose_move(sims) for sims in CHOOSE_MOVE_SIMULATIONS},
+    "full_game": bench_full_game,
+}
+
+
+def measure(bench, min_time=0.5, repeat=3):
+    """Best rate of repeat runs, each run grown until it takes at least min_time seconds."""
+    n = 1
+    while True:
+        random.seed(0)
+        start = time.perf_counter()
+        ops = bench(n)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / 10:
+            break
+        n *= 10
+    n = max(1, int(n * min_time / max(elapsed, 1e-9)))
+    best = 0.0
+    for _ in range(repeat):
+        random.seed(0)
+        start = time.perf_counter()
+        ops = bench(n)
+        best = max(best, ops / (time.perf_counter() - start))
+    return best
+
+
+def run_benchmarks(names=None, min_time=0.5, repeat=3):
+    results = {}
+    for name in names or BENCHMARKS:
+        rate = measure(BENCHMARKS[name], min_time, repeat)
+        results[name] = rate
+        print(f"{name:22} {rate:14,.1f} /s   {1000 / rate:10.4f} ms")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Names of the benchmarks that are more than threshold slower than the baseline."""
+    regressions = []
+    for name, rate in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        change = rate / old - 1
+        flag = "REGRESSION" if change < -threshold else ""
+        print(f"{name:22} {old:14,.1f} -> {rate:14,.1f} /s  {change:+7.1%} {flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Sedmice speed benchmarks.")
+    parser.add_argument("names", nargs="*", help=f"Benchmarks to run, all by default: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--out", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file of an earlier run to compare against")
+    parser.add_argument("--save-baseline", help="Write the results as a new baseline file")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed slowdown against the baseline as a fraction (default 0.2)")
+    parser.add_argument("--quick", action="store_true", help="Shorter runs, noisier numbers")
+    args = parser.parse_args(argv)
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark {name!r}")
+
+    results = run_benchmarks(args.names, *((0.1, 1) if args.quick else (0.5, 3)))
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    for path in filter(None, (args.out, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        print("Results written to", path)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) slower than the baseline by more than {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,16 +2,26 @@ import pygame
 import sys
 from pygame.locals import *
 import random
+from functools import partial
 # Assuming you've defined Player and Deck correctly
-from Helper.player import Player
+from Helper.engine import GameState, PASS
+from Helper.tracker import CardTracker
+from Helper.cardset import card_id, card_from_id
 from Helper.deck import Deck
 from Helper.card import Card
+from Helper.game_record import GameRecorder, append_game
+from Helper.render import TableRenderer
+from Helper.app import App, BACK, EXIT
+from Helper.rng import derive_seed
 from Bots.monte_carlo_bot import MonteCarloBot
+from Bots.ismcts_bot import ISMCTSBot
 
 BOT_SIMULATION_COUNT = 100
-
-# Initialize Pygame
-pygame.init()
+BOT_WORKERS = 1  # Processes the bot spreads its simulations over
+BOT_SEARCH = "monte_carlo"  # "monte_carlo" or "ismcts"
+BOT_ISMCTS_ITERATIONS = 200
+BOT_TIME_BUDGET_MS = None  # Milliseconds per decision, None runs the fixed simulation counts
+BOT_MOVE_DELAY_MS = 500
 
 # Game Constants
 SCREEN_WIDTH, SCREEN_HEIGHT = 1920, 1080
@@ -19,6 +29,9 @@ BG_COLOR = pygame.Color('darkgreen')
 FONT_COLOR = pygame.Color('black')
 FONT_SIZE = 30 
 CARD_GAP = 70  # Space between displayed cards
+CARD_SIZE = (FONT_SIZE * 6, FONT_SIZE * 6)
+HAND_POSITIONS = [(500, SCREEN_HEIGHT - 300), (500, 150)]  # Player 1 at the bottom, Player 2 at the top
+FPS = 30  # Frame cap, the loop sleeps in between
 
 # Button properties
 BUTTON_COLOR = pygame.Color('darkgrey')
@@ -26,54 +39,8 @@ BUTTON_TEXT_COLOR = pygame.Color('black')
 BUTTON_POSITION = (SCREEN_WIDTH - 400, SCREEN_HEIGHT //2)  # Adjust as needed
 BUTTON_SIZE = (150, 50)  # Width, Height
 
-# Fonts
-font = pygame.font.Font(None, FONT_SIZE)
-
-# Set up the display
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption('Sedmice')
-
-
+GAME_LOG = "games.sedm"  # Every game played is appended here, see Helper.game_record
 
-def display_hand(player, x, y):
-    card_rects = []
-    card_width = FONT_SIZE * 6  # Adjust based on the expected width of text
-    card_height = FONT_SIZE * 6  # Roughly estimate card height
-    card_background_color = pygame.Color('white')  # Define the background color for the cards
-    for i, card in enumerate(player.hand):
-        card_text = f"{card.rank} of {card.suit}"
-        text_surface = font.render(card_text, True, FONT_COLOR)
-        text_rect = text_surface.get_rect()  # Get the rectangle that bounds the text
-        
-        card_position = (x + (i * (card_width + CARD_GAP)), y)
-        
-        # Create a rectangle for the card
-        card_rect = pygame.Rect(card_position[0], card_position[1], card_width, card_height)
-        
-        # Calculate the position to center the text in the card_rect
-        text_x = card_rect.x + (card_rect.width - text_rect.width) // 2
-        text_y = card_rect.y + (card_rect.height - text_rect.height) // 2
-        
-        # Draw the background rectangle
-        pygame.draw.rect(screen, card_background_color, card_rect)
-        
-        # Blit the text at the calculated centered position
-        screen.blit(text_surface, (text_x, text_y))
-        
-        card_rects.append(card_rect)
-    
-    return card_rects
-
-def draw_pass_button():
-    button_font = pygame.font.SysFont(None, FONT_SIZE)
-    button_text = button_font.render('Pass the Turn', True, BUTTON_TEXT_COLOR)
-    button_rect = pygame.Rect(BUTTON_POSITION[0], BUTTON_POSITION[1], *BUTTON_SIZE)
-
-    pygame.draw.rect(screen, BUTTON_COLOR, button_rect)  # Draw the button background
-    text_rect = button_text.get_rect(center=button_rect.center)
-    screen.blit(button_text, text_rect)  # Draw the text on top
-
-    return button_rect
 
 
 def check_button_click(mouse_pos, button_rect):
@@ -81,269 +48,121 @@ def check_button_click(mouse_pos, button_rect):
         return True
     return False
 
-def display_middle_card(card, x, y):
-    if card is None:
-        return  # No card to display
-
-    card_text = f"{card.rank} of {card.suit}"
-    text_surface = font.render(card_text, True, FONT_COLOR)
-    text_rect = text_surface.get_rect()
-
-    # Adjust card width and height if necessary
-    card_width = FONT_SIZE * 6
-    card_height = FONT_SIZE * 6
-    card_background_color = pygame.Color('white')
-
-    # Calculate center position for the card
-    # Note: x and y parameters allow for flexibility in positioning if needed
-    card_rect = pygame.Rect(x, y, card_width, card_height)
-    card_rect.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
-
-    # Calculate position to center the text in the card_rect
-    text_x = card_rect.x + (card_rect.width - text_rect.width) // 2
-    text_y = card_rect.y + (card_rect.height - text_rect.height) // 2
-
-    # Draw the background rectangle
-    pygame.draw.rect(screen, card_background_color, card_rect)
-
-    # Blit the text at the calculated centered position
-    screen.blit(text_surface, (text_x, text_y))
-
-
-def playable(card, player, card_in_the_middle, current_player, initiative_player):
-    if card_in_the_middle == []:
-        return True
-    if player != initiative_player:
-        return True
-    if player != current_player:
-        return False
-    if card.rank == "7":
-        return True
-    if card.rank == card_in_the_middle[0].rank:
-        return True
-    return False
-
 
-def run_game(mode, number):
-    # Instantiate players
-    player1 = Player("Player 1")
-    player2 = Player("Player 2")
-            
-    bot = MonteCarloBot(BOT_SIMULATION_COUNT)
+def apply_action(state, action, recorder):
+    """Plays the action through the engine, records it and reports what happened."""
+    player = state.current
+    if action == PASS:
+        print(f"Player {player + 1} passed the turn")
+    else:
+        print(f"Player {player + 1} played {card_from_id(action)}")
+    recorder.add_action(state, action)
+    taker = state.step(action)
+    if taker is not None:
+        print(f"END OF HAND AND PLAYER {taker + 1} TAKES THE MIDDLE")
+        print("points", state.scores())
+
+
+def make_renderer(app):
+    """The card table drawing, shared by every game the application plays."""
+    return TableRenderer(app.screen, app.font(None, FONT_SIZE), app.font(None, FONT_SIZE, system=True),
+                         HAND_POSITIONS, (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2), (BUTTON_POSITION, BUTTON_SIZE),
+                         CARD_SIZE, CARD_GAP, BG_COLOR, 'white', FONT_COLOR, BUTTON_COLOR, BUTTON_TEXT_COLOR)
+
+
+def run_game(app, mode, number, seed=None):
+    """Game scene (see Helper.app): plays one game and returns BACK, or EXIT if the window was closed."""
+    # One random stream for the initiative and every deck, a seed replays the same deals
+    rng = random.Random(seed)
+    # The bot and its worker pool are kept by the application for the next game
+    if BOT_SEARCH == "ismcts":
+        bot = app.shared(("ismcts", BOT_ISMCTS_ITERATIONS), partial(ISMCTSBot, BOT_ISMCTS_ITERATIONS))
+    else:
+        bot = app.shared(("monte_carlo", BOT_SIMULATION_COUNT, BOT_WORKERS),
+                         partial(MonteCarloBot, BOT_SIMULATION_COUNT, workers=BOT_WORKERS))
+    bot.reseed(None if seed is None else derive_seed(seed, "bot"))
 
     if mode == "Random":
-        if random.choice([True, False]):
-            initiative_player = player1
-            non_initiative_player = player2
-        else:
-            initiative_player = player2
-            non_initiative_player = player1
+        initiative = rng.choice((0, 1))
     elif mode == "Player":
-        initiative_player = player1
-        non_initiative_player = player2
+        initiative = 0
     else:
-        initiative_player = player2
-        non_initiative_player = player1
-    
-    current_player = initiative_player
+        initiative = 1
+
     # Create and shuffle the deck
-    deck = Deck()
+    deck = Deck(rng)
     deck.shuffle_deck()
-    deck.write_down_deck("precut_deck")
     deck.cut_deck(number)
-    deck.write_down_deck()
-    
-    # Deal 4 cards to each player
-    player1.draw(deck, 4)
-    player2.draw(deck, 4)
-    cards_in_the_middle = []
-    middle_card_score = 0
-    
-    temp_score_player1 = 0
-    temp_score_player2 = 0
-    
-    # Game loop
-    while True:
-        initiative_wants_to_play = True
-        end_of_hand = False
-        # Clear the screen
-        screen.fill(BG_COLOR)
-
-        # Display player hands
-        if initiative_player == player1:
-            initiative_card_rects = display_hand(player1, 500, SCREEN_HEIGHT - 300)  # Adjust positioning as needed
-            non_initiative_card_rects = display_hand(player2, 500, 150)  # Adjust positioning as needed
-        elif initiative_player == player2:
-            non_initiative_card_rects = display_hand(player1, 500, SCREEN_HEIGHT - 300)  # Adjust positioning as needed
-            initiative_card_rects = display_hand(player2, 500, 150)  # Adjust positioning as needed
-            
-        button_rect = draw_pass_button()  # This should be called within your main game loop
 
-        
-        if cards_in_the_middle: 
-            # Display the middle card
-            display_middle_card(cards_in_the_middle[-1], SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
-
-        
-        mouse_pos = None  # Initialize mouse_pos at the beginning of the loop
-        cards_in_the_deck = player1.hand + deck.cards
-        if current_player == player2 and bot:  # Assuming player2 is the computer
+    # The engine deals 4 cards to each player and keeps the rules, the tracker
+    # holds what the bot has seen
+    tracker = CardTracker(1)
+    recorder = GameRecorder(initiative, number)
+    state = GameState(initiative, deck=deck, rng=rng, trackers=[tracker, recorder])
+
+    screen = app.display((SCREEN_WIDTH, SCREEN_HEIGHT), 'Sedmice')
+    renderer = app.shared("table_renderer", partial(make_renderer, app))
+    renderer.invalidate(screen)
+    button_rect = renderer.button_rect
+
+    # Game loop, only changed cards are redrawn
+    while not state.is_terminal():
+        hands = [state.hand_cards(0), state.hand_cards(1)]
+        card_rects = renderer.draw(hands, card_from_id(state.last) if state.middle else None)
+
+        action = None
+        bot_to_move = state.current == 1 and bot  # Player 2 is the computer
+        if bot_to_move:
+            pygame.time.wait(BOT_MOVE_DELAY_MS)  # Let the player see the table before the bot moves
             # Get bot's decision
             card_index, should_pass = bot.choose_move(
-                player2.hand,
-                cards_in_the_middle,
-                cards_in_the_deck,
-                len(player1.hand),
-                current_player == initiative_player
+                hands[1],
+                state.middle_cards(),
+                tracker.unseen_cards(),
+                tracker.opponent_hand_size,
+                state.current == state.initiative,
+                time_budget_ms=BOT_TIME_BUDGET_MS
             )
-            
-            if should_pass:
-                initiative_wants_to_play = False
-            elif card_index is not None:
-                selected_card = player2.hand[card_index]
-                cards_in_the_middle.append(selected_card)
-                middle_card_score += selected_card.get_score()
-                if (cards_in_the_middle[-1].rank not in 
-                    (cards_in_the_middle[0].rank, "7") and 
-                    current_player != initiative_player):
-                    print("END OF HAND AND FIRST PLAYER WINS")
-                    end_of_hand = True
-                player2.hand.pop(card_index)
-                print(f"Computer played {selected_card}")
-                current_player = player1 if current_player == player2 else player2
+            action = PASS if should_pass or card_index is None else card_id(hands[1][card_index])
+            if not state.is_legal(action):
+                raise RuntimeError(f"{type(bot).__name__} chose the illegal action {action} with hand {hands[1]} "
+                                   f"and middle {state.middle_cards()}")
 
-        pygame.time.wait(500)
+        # Sleep until something happens while waiting for the player
+        events = pygame.event.get() if bot_to_move else [pygame.event.wait()] + pygame.event.get()
         #Checks if you can play the card
-        for event in pygame.event.get():
+        for event in events:
             if event.type == QUIT:
-                pygame.quit()
-                sys.exit()
-            elif event.type == MOUSEBUTTONDOWN:
+                append_game(GAME_LOG, recorder.record())
+                return EXIT
+            elif event.type == VIDEOEXPOSE:
+                renderer.invalidate()
+            elif event.type == MOUSEBUTTONDOWN and action is None:
                 mouse_pos = event.pos
-                if current_player == initiative_player:
-                    if button_rect.collidepoint(mouse_pos):
-                        print("Pass the Turn button clicked")
-                        initiative_wants_to_play = False
+                if check_button_click(mouse_pos, button_rect) and state.is_legal(PASS):
+                    action = PASS
+                    break
+                for card, rect in zip(hands[state.current], card_rects[state.current]):
+                    if rect.collidepoint(mouse_pos) and state.is_legal(card_id(card)):
+                        action = card_id(card)
                         break
-            if current_player == initiative_player:
-                for index, rect in enumerate(initiative_card_rects):
-                    if mouse_pos and rect.collidepoint(mouse_pos):
-                        print(f"Player 1's card at index {index} was clicked.")
-                        selected_card = initiative_player.hand[index]
-                        if playable(selected_card, initiative_player, cards_in_the_middle, initiative_player, initiative_player):
-                            cards_in_the_middle.append(selected_card)  # Move the selected card to the middle
-                            middle_card_score += cards_in_the_middle[-1].get_score()
-                            initiative_player.hand.pop(index)  # Remove the card from player's hand
-                            print(f"Player 1 played {selected_card}")
-                            current_player = non_initiative_player if current_player == initiative_player else initiative_player
-                            break
-            elif current_player == non_initiative_player:
-                for index, rect in enumerate(non_initiative_card_rects):
-                    if mouse_pos and rect.collidepoint(mouse_pos):
-                        print(f"Player 2's card at index {index} was clicked.")
-                        selected_card = non_initiative_player.hand[index]
-                        if playable(selected_card, non_initiative_player, cards_in_the_middle, non_initiative_player, initiative_player):
-                            cards_in_the_middle.append(selected_card)  # Move the selected card to the middle
-                            middle_card_score += cards_in_the_middle[-1].get_score()
-                            if cards_in_the_middle[-1].rank not in (cards_in_the_middle[0].rank, "7"):
-                                print("END OF HAND AND FIRST PLAYER WINS")
-                                end_of_hand = True
-                            non_initiative_player.hand.pop(index)  # Remove the card from player's hand
-                            print(f"Player 2 played {selected_card}")
-                            current_player = non_initiative_player if current_player == initiative_player else initiative_player
-                            break
-                            
-            
-                    
-        
-        # Update the display
-        pygame.display.flip()
+                if action is not None:
+                    break
 
-        # END OF HAND AND FIRST PLAYER WINS
-        if end_of_hand:
-            print(initiative_player, non_initiative_player)
-            print(current_player)
-            print("end of hand and first player wins")
-            if initiative_player.name == "Player 1":
-                temp_score_player1 += middle_card_score
-            else:
-                temp_score_player2 += middle_card_score
-            initiative_player.points += middle_card_score
-            if initiative_player.points >= 510:
-                print(f"{initiative_player} WINS")
-                break
-            middle_card_score = 0
-            if len(cards_in_the_middle) > len(deck):
-                initiative_player.draw(deck, len(deck)//2)
-                non_initiative_player.draw(deck, len(deck)//2)
-            else:
-                initiative_player.draw(deck, len(cards_in_the_middle)//2)
-                non_initiative_player.draw(deck, len(cards_in_the_middle)//2)
-            cards_in_the_middle = []
-            initiative_player, non_initiative_player = initiative_player, non_initiative_player
-            current_player = initiative_player
-            print(initiative_player, non_initiative_player)
-            print(current_player)
-            continue
+        if action is not None:
+            apply_action(state, action, recorder)
+        app.clock.tick(FPS)
+
+    print(f"Player {state.winner + 1} WINS", state.scores())
+    append_game(GAME_LOG, recorder.record())
+    return BACK
 
-        ############################################################################################################
-        ######################### SECOND PLAYER WIN CONDITION IS FIRST PLAYER CAN'T PLAY ANYTHING OR CHOOSES NOT TO
-        if cards_in_the_middle != []:
-            # FIRST PLAYER CHOOSES NOT TO
-            if initiative_wants_to_play == False:
-                print(initiative_player, non_initiative_player)
-                print(current_player)
-                print("b")
-                if non_initiative_player.name == "Player 1":
-                    temp_score_player1 += middle_card_score
-                else:
-                    temp_score_player2 += middle_card_score
-                non_initiative_player.points += middle_card_score
-                if non_initiative_player.points >= 510:
-                    print(f"{non_initiative_player} WINS - DOESNT WANT TO PALY")
-                    break
-                middle_card_score = 0
-                if len(cards_in_the_middle) > len(deck):
-                    non_initiative_player.draw(deck, len(deck)//2)
-                    initiative_player.draw(deck, len(deck)//2)
-                else:
-                    non_initiative_player.draw(deck, len(cards_in_the_middle)//2)
-                    initiative_player.draw(deck, len(cards_in_the_middle)//2)
-                cards_in_the_middle = []
-                initiative_player, non_initiative_player = non_initiative_player, initiative_player
-                current_player = initiative_player
-                print(initiative_player, non_initiative_player)
-                print(current_player)
-                continue
-        if not player1.has_cards() and not player2.has_cards():
-            print("human", player1.points)
-            print("bot", player2.points)
-            deck = Deck()
-            deck.shuffle_deck()
-            deck.write_down_deck()
-            
-            # Deal 4 cards to each player
-            player1.draw(deck, 4)
-            player2.draw(deck, 4)
-            cards_in_the_middle = []
-            middle_card_score = 0
-            if temp_score_player1 > temp_score_player2:
-                initiative_player = player1
-                non_initiative_player = player2
-            elif temp_score_player2 > temp_score_player1:
-                initiative_player = player2
-                non_initiative_player = player1
-            else:
-                pass  #nista se ne menja onaj sa inicijativom je zadrzava
-            temp_score_player1 =0
-            temp_score_player2 =0
-                
-                
 
 if __name__ == '__main__':
-    if len(sys.argv) == 3:
+    if len(sys.argv) in (3, 4):
         mode = sys.argv[1]
         number = int(sys.argv[2])
-        run_game(mode, number)
+        seed = int(sys.argv[3]) if len(sys.argv) == 4 else None
+        App().run(partial(run_game, mode=mode, number=number, seed=seed))
     else:
-        print("Invalid arguments. Please provide game mode and number.")
+        print("Invalid arguments. Please provide game mode, number and optionally a seed.")
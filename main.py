@@ -1,11 +1,7 @@
 import pygame
-import sys
-import os
-import subprocess
 from pygame.locals import *
-
-# Initialize Pygame
-pygame.init()
+from Helper.app import App, EXIT
+import setup
 
 # Screen dimensions and colors
 SCREEN_WIDTH, SCREEN_HEIGHT = 800, 600  # Adjust as needed
@@ -20,81 +16,82 @@ TITLE_COLOR = pygame.Color('lightblue')  # Title color
 BORDER_COLOR = pygame.Color('black')  # Border color
 TITLE_FONT_COLOR = pygame.Color('lightgray')  # Text color for the title
 TITLE_FONT_SIZE = 150  # Increased font size
-border_shift = 5  # Border thickness
-
-# Set up the display
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption('SEDMICE Main Menu')
+border_shift = 8  # Border thickness
 
-# Fonts
-menu_font = pygame.font.Font(None, MENU_FONT_SIZE)
-title_font = pygame.font.Font(None, TITLE_FONT_SIZE)
+# Display and fonts, taken from the App when the menu is shown
+screen = None
+menu_font = None
+title_font = None
 
 # Menu options
 options = ['Start Game Free Play', 'Options', 'Exit']
 option_rects = []
 
-def draw_menu():
-    screen.fill(BG_COLOR)
+menu_surface = None  # The whole menu, composed once by build_menu
 
-    # Adjusted title settings
-    title_text = TITLE_TEXT
-    title_color = TITLE_COLOR  # Title color
-    border_color = BORDER_COLOR  # Border color
-    title_font_size = TITLE_FONT_SIZE  # Increased font size
-    title_font = pygame.font.Font(None, title_font_size)
-    border_shift =  8 # Adjust border thickness if needed
+def build_menu():
+    """Composes the menu into menu_surface and sets option_rects for hit testing."""
+    global menu_surface
+    surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    surface.fill(BG_COLOR)
 
-   # Draw the bordered title
-    # First, draw the border
+    # Draw the bordered title
+    # First, draw the border by placing the title in the border color all around it
+    border_surface = title_font.render(TITLE_TEXT, True, BORDER_COLOR)
     for dx in range(-border_shift, border_shift+1):
         for dy in range(-border_shift, border_shift+1):
             if dx or dy:  # Draw border components
-                title_surface = title_font.render(title_text, True, border_color)
-                title_rect = title_surface.get_rect(center=(SCREEN_WIDTH // 2 + dx, SCREEN_HEIGHT // 4 + dy))
-                screen.blit(title_surface, (title_rect.x - border_shift // 2, title_rect.y))
+                title_rect = border_surface.get_rect(center=(SCREEN_WIDTH // 2 + dx, SCREEN_HEIGHT // 4 + dy))
+                surface.blit(border_surface, (title_rect.x - border_shift // 2, title_rect.y))
 
     # Then, draw the main title text in the intended color on top of the border
-    title_surface = title_font.render(title_text, True, title_color)
+    title_surface = title_font.render(TITLE_TEXT, True, TITLE_COLOR)
     title_rect = title_surface.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 4))
-    screen.blit(title_surface, title_rect)
-    
+    surface.blit(title_surface, title_rect)
+
     # Draw the menu options
+    option_rects.clear()
     for index, option in enumerate(options):
         option_surface = menu_font.render(option, True, FONT_COLOR)
         option_rect = option_surface.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + index * 60))
         option_rects.append(option_rect)
-        screen.blit(option_surface, option_rect)
+        surface.blit(option_surface, option_rect)
 
-    pygame.display.flip()
+    menu_surface = surface.convert()
 
-def main_menu():
-    running = True
-    while running:
-        draw_menu()
+def draw_menu():
+    if menu_surface is None:
+        build_menu()
+    screen.blit(menu_surface, (0, 0))
+    pygame.display.flip()
 
-        for event in pygame.event.get():
-            if event.type == QUIT:
-                running = False
-                pygame.quit()
-                sys.exit()
+def main_menu(app):
+    """Menu scene (see Helper.app): returns the scene that was picked, or EXIT."""
+    global screen, menu_font, title_font
+    screen = app.display((SCREEN_WIDTH, SCREEN_HEIGHT), 'SEDMICE Main Menu')
+    menu_font = app.font(None, MENU_FONT_SIZE)
+    title_font = app.font(None, TITLE_FONT_SIZE)
+    draw_menu()
+    while True:
+        # Sleep until something happens, the menu is only redrawn when the window needs it
+        for event in [pygame.event.wait()] + pygame.event.get():
+            if event.type in (VIDEOEXPOSE, VIDEORESIZE):
+                draw_menu()
+            elif event.type == QUIT:
+                return EXIT
             elif event.type == MOUSEBUTTONDOWN:
                 mouse_pos = event.pos
                 for index, rect in enumerate(option_rects):
                     if rect.collidepoint(mouse_pos):
                         if index == 0:
                             print("Starting Free Play...")
-                            pygame.quit()  # Close the Pygame window
-                            os.system('python setup.py')  # Calls setup.py which in turn starts the game
-                            running = False
-                            
+                            return setup.main  # The setup screen, which in turn starts the game
+
                         elif index == 1:
                             print("Opening Options...")
                             # options_function()  # Placeholder, define this function for handling options
                         elif index == 2:
-                            running = False
-                            pygame.quit()
-                            sys.exit()
+                            return EXIT
 
 if __name__ == '__main__':
-    main_menu()
+    App().run(main_menu)
@@ -1,19 +1,17 @@
 import pygame
-import subprocess
-import sys
-
-# Initialize Pygame
-pygame.init()
+from functools import partial
+from Helper.app import App, BACK, EXIT
+import game
+import game_mc
 
 # Screen settings
 screen_width, screen_height = 640, 480
-screen = pygame.display.set_mode((screen_width, screen_height))
-pygame.display.set_caption("Game Mode Selection")
+FPS = 30
 
 # Colors and Fonts
 GREEN = pygame.Color('darkgreen')
 BLACK = (0, 0, 0)
-font = pygame.font.SysFont("Arial", 24)
+font = None  # Taken from the App when the screen is shown
 
 # Global state
 input_text = '0'
@@ -87,9 +85,11 @@ def draw_button(screen, rect, text, color):
     text_rect = text_surf.get_rect(center=rect.center)
     screen.blit(text_surf, text_rect)
 
-def main():
-    global input_text, selected_option, selected_bot_mode, input_color, input_active
-    running = True
+def main(app):
+    """Setup scene (see Helper.app): returns the game scene to play, BACK on Escape or EXIT."""
+    global input_text, selected_option, selected_bot_mode, input_color, input_active, font
+    screen = app.display((screen_width, screen_height), "Game Mode Selection")
+    font = app.font("Arial", 24, system=True)
 
     # Define options
     primary_options = ["Random", "Player", "Bot"]
@@ -98,46 +98,49 @@ def main():
     # Create radio buttons for primary options (left side)
     primary_radio_buttons = []
     for idx, option in enumerate(primary_options):
-        RadioButton(50, 60 + idx * 40, option, primary_radio_buttons)
+        RadioButton(50, 60 + idx * 40, option, primary_radio_buttons).selected = option == selected_option
     
     # Create radio buttons for bot sub-options (right side)
     bot_radio_buttons = []
     for idx, option in enumerate(bot_suboptions):
-        RadioButton(screen_width - 250, 60 + idx * 40, option, bot_radio_buttons)
+        RadioButton(screen_width - 250, 60 + idx * 40, option, bot_radio_buttons).selected = option == selected_bot_mode
 
     label_first = "Who plays first"
     label_opponent = "Opponent"
 
-    while running:
+    while True:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                running = False
+                return EXIT
             elif event.type == pygame.MOUSEBUTTONDOWN:
-                handle_mouse_event(event.pos, primary_radio_buttons, bot_radio_buttons, input_rect, button_rect)
+                game_scene = handle_mouse_event(event.pos, primary_radio_buttons, bot_radio_buttons, input_rect,
+                                                button_rect)
+                if game_scene is not None:
+                    return game_scene
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                return BACK
             elif event.type == pygame.KEYDOWN and input_active:
                 handle_keyboard_event(event)
 
         draw_ui(screen, primary_radio_buttons, bot_radio_buttons, label_first, label_opponent)
-
-    pygame.quit()
-    sys.exit()
+        app.clock.tick(FPS)
 
 def handle_mouse_event(pos, primary_radio_buttons, bot_radio_buttons, input_rect, button_rect):
+    """Returns the game scene once Start Game is clicked, else None."""
     global input_active, input_color, input_text, selected_option, selected_bot_mode
     if input_rect.collidepoint(pos):
         input_active = not input_active
         input_color = pygame.Color('lightskyblue2') if input_active else pygame.Color('white')
     elif button_rect.collidepoint(pos):
         print(f"Start Game with option: {selected_option}, bot mode: {selected_bot_mode}, number: {input_text}")
-        pygame.quit()
+        number = int(input_text) if input_text else 0
 
         if selected_bot_mode == "Monte Carlo":
-            subprocess.run(['python', 'game_mc.py',selected_option, input_text])
+            return partial(game_mc.run_game, mode=selected_option, number=number)
         elif selected_bot_mode == "Player":
-            subprocess.run(['python', 'game.py', selected_option, input_text])
+            return partial(game.run_game, mode=selected_option, number=number)
         else:
-            subprocess.run(['python', 'game.py', selected_option, input_text])
-        sys.exit()
+            return partial(game.run_game, mode=selected_option, number=number)
     else:
         input_active = False
         input_color = pygame.Color('white')
@@ -172,4 +175,4 @@ def handle_keyboard_event(event):
                 input_text = temp_text
 
 if __name__ == "__main__":
-    main()
+    App().run(main)
@@ -0,0 +1,222 @@
+"""Headless self-play tournament between two bot configurations.
+
+    python -m tournament mc:num_simulations=100 ismcts:num_iterations=200 --matches 2000 --out results.jsonl
+
+A bot is given as name[:key=value,...] with name one of BOTS; the key=value
+pairs are passed to the bot's constructor. Bots are built inside the daemonic
+pool processes, which cannot start pools of their own, so workers above 1 is
+rejected; use --workers to spread the matches instead. Matches are played to 510 points
+on all cores, seats and the starting initiative alternate, every finished
+match is appended to the JSONL file and a summary with 95% confidence
+intervals is printed at the end. Match m of a run with --seed s can be
+replayed alone with play_match(bot_a, bot_b, s, m).
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+from Helper.engine import GameState, PASS
+from Helper.tracker import CardTracker
+from Helper.cardset import card_id
+from Helper.rng import derive_seed, stream
+from Bots.monte_carlo_bot import MonteCarloBot
+from Bots.ismcts_bot import ISMCTSBot
+from Bots.random_bot import RandomBot
+
+BOTS = {
+    "random": RandomBot,
+    "mc": MonteCarloBot,
+    "ismcts": ISMCTSBot,
+}
+
+
+def parse_bot(spec):
+    """Turns "mc:num_simulations=100,workers=1" into ("mc", {"num_simulations": 100, "workers": 1}).
+
+    Raises ValueError for an unknown bot or a workers value above 1.
+    """
+    name, _, args = spec.partition(":")
+    if name not in BOTS:
+        raise ValueError(f"Unknown bot {name!r}, expected one of {', '.join(BOTS)}")
+    kwargs = {}
+    for pair in filter(None, args.split(",")):
+        key, _, value = pair.partition("=")
+        try:
+            kwargs[key] = json.loads(value)
+        except ValueError:
+            kwargs[key] = value
+    if kwargs.get("workers", 1) != 1:
+        raise ValueError(f"{spec!r}: bots play inside the match worker processes and cannot start their own, "
+                         "use workers=1 and the --workers option")
+    return name, kwargs
+
+
+def make_bot(spec):
+    name, kwargs = parse_bot(spec)
+    return BOTS[name](**kwargs)
+
+
+def choose_action(bot, state, tracker):
+    """Asks a bot for its move, using only what its tracker has seen."""
+    player = tracker.player
+    hand = state.hand_cards(player)
+    card_index, should_pass = bot.choose_move(
+        hand,
+        state.middle_cards(),
+        tracker.unseen_cards(),
+        tracker.opponent_hand_size,
+        state.current == state.initiative
+    )
+    action = PASS if should_pass or card_index is None else card_id(hand[card_index])
+    if not state.is_legal(action):
+        raise RuntimeError(f"{type(bot).__name__} chose the illegal action {action}")
+    return action
+
+
+def match_setup(match):
+    """Seat of bot A and the starting initiative of a match.
+
+    Bot A takes seat 0 in even matches, the starting initiative alternates every two matches.
+    """
+    return match % 2, (match // 2) % 2
+
+
+def play_match(bot_a, bot_b, master_seed, match):
+    """Plays match number match to 510 points.
+
+    The deck and both bots get their own random streams derived from
+    (master_seed, match), so a match replays the same whichever process
+    plays it and whatever was played before. Decision caches are emptied for
+    the same reason, a cached bot only reuses positions within a match.
+    Returns the final GameState and the number of decisions made.
+    """
+    a_seat, initiative = match_setup(match)
+    for bot, key in ((bot_a, "a"), (bot_b, "b")):
+        bot.reseed(derive_seed(master_seed, match, key))
+        cache = getattr(bot, "cache", None)
+        if cache is not None:
+            cache.clear()
+    bots = (bot_a, bot_b) if a_seat == 0 else (bot_b, bot_a)
+    trackers = [CardTracker(0), CardTracker(1)]
+    state = GameState(initiative, trackers=trackers, rng=stream(master_seed, match, "deck"))
+    decisions = 0
+    while not state.is_terminal():
+        player = state.current
+        state.step(choose_action(bots[player], state, trackers[player]))
+        decisions += 1
+    return state, decisions
+
+
+# Bots of a worker process, built once by _init_worker and reused for every match
+_worker_bots = None
+
+
+def _init_worker(spec_a, spec_b):
+    global _worker_bots
+    _worker_bots = (make_bot(spec_a), make_bot(spec_b))
+
+
+def _run_match(job):
+    match, master_seed = job
+    a_seat, initiative = match_setup(match)
+    bot_a, bot_b = _worker_bots
+    for bot in _worker_bots:
+        if getattr(bot, "collect_stats", False):
+            bot.reset_match_stats()
+    start = time.perf_counter()
+    state, decisions = play_match(bot_a, bot_b, master_seed, match)
+    result = {
+        "match": match,
+        "seed": master_seed,
+        "a_seat": a_seat,
+        "initiative": initiative,
+        "winner": "a" if state.winner == a_seat else "b",
+        "a_points": state.points[a_seat],
+        "b_points": state.points[1 - a_seat],
+        "decisions": decisions,
+        "seconds": round(time.perf_counter() - start, 4),
+    }
+    # Search cost of bots built with collect_stats=true
+    for key, bot in (("a_search", bot_a), ("b_search", bot_b)):
+        if getattr(bot, "collect_stats", False):
+            result[key] = bot.match_stats.as_dict()
+    return result
+
+
+def wilson_interval(wins, n, z=1.96):
+    """95% Wilson score interval of a win rate."""
+    if not n:
+        return 0.0, 1.0
+    p = wins / n
+    centre = (p + z * z / (2 * n)) / (1 + z * z / n)
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return centre - half, centre + half
+
+
+def summarize(results):
+    """Win rate of bot A and mean point difference A - B, both with 95% confidence intervals."""
+    n = len(results)
+    wins = sum(r["winner"] == "a" for r in results)
+    diffs = [r["a_points"] - r["b_points"] for r in results]
+    mean = sum(diffs) / n if n else 0.0
+    sd = math.sqrt(sum((d - mean) ** 2 for d in diffs) / (n - 1)) if n > 1 else 0.0
+    half = 1.96 * sd / math.sqrt(n) if n else 0.0
+    return {
+        "matches": n,
+        "a_wins": wins,
+        "a_win_rate": wins / n if n else 0.0,
+        "a_win_rate_ci": wilson_interval(wins, n),
+        "score_diff": mean,
+        "score_diff_ci": (mean - half, mean + half),
+    }
+
+
+def run_tournament(spec_a, spec_b, matches, workers=None, out=None, seed=0):
+    """Plays the matches on a process pool, streaming every result to out (a JSONL path)."""
+    workers = workers or os.cpu_count() or 1
+    jobs = [(match, seed) for match in range(matches)]
+    results = []
+    sink = open(out, "a", encoding="utf-8") if out else None
+    try:
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(spec_a, spec_b)) as pool:
+            for result in pool.imap_unordered(_run_match, jobs, chunksize=max(1, matches // (workers * 16))):
+                results.append(result)
+                if sink:
+                    sink.write(json.dumps(result) + "\n")
+                    sink.flush()
+    finally:
+        if sink:
+            sink.close()
+    return summarize(results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play Sedmice matches between two bots.")
+    parser.add_argument("bot_a", help="First bot, e.g. mc:num_simulations=100")
+    parser.add_argument("bot_b", help="Second bot, e.g. ismcts:num_iterations=200 or random")
+    parser.add_argument("--matches", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None, help="Processes to use, all cores by default")
+    parser.add_argument("--out", default=None, help="JSONL file the match results are appended to")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    for spec in (args.bot_a, args.bot_b):
+        try:
+            parse_bot(spec)
+        except ValueError as error:
+            parser.error(str(error))
+
+    start = time.perf_counter()
+    summary = run_tournament(args.bot_a, args.bot_b, args.matches, args.workers, args.out, args.seed)
+    low, high = summary["a_win_rate_ci"]
+    diff_low, diff_high = summary["score_diff_ci"]
+    print(f"{args.bot_a} vs {args.bot_b}: {summary['matches']} matches in {time.perf_counter() - start:.1f}s")
+    print(f"win rate {summary['a_win_rate']:.3f} (95% CI {low:.3f}-{high:.3f})")
+    print(f"score difference {summary['score_diff']:.1f} (95% CI {diff_low:.1f} to {diff_high:.1f})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())